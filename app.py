@@ -1,7 +1,6 @@
 import json
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Request, request, jsonify, render_template, Response, stream_with_context, g, send_file, url_for
 from flask_cors import CORS
-from docx import Document
 import PyPDF2
 import io
 import google.generativeai as genai
@@ -10,17 +9,69 @@ import os
 import magic
 import bleach
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from werkzeug.exceptions import RequestEntityTooLarge
 import re
+import tempfile
+import shutil
+import secrets
+import time
+import math
+import gzip
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask_talisman import Talisman
+from collections import OrderedDict
+import threading
+import contextvars
+import gevent
+from gevent import monkey
+from cache import TieredCache, content_hash
+from sqlite_cache import SQLiteCache
+from retrieval import BM25Index, chunk_spans, paragraph_spans
+from pdf_extract import PdfExtractor
+from docx_extract import DocxError, is_docx, iter_paragraphs
+from jobs import JobQueue, QueueFull
+from speculative import SpeculativeQueue
+from singleflight import SingleFlight
+from compaction import compact_pages
+from context_cache import ContextCache, UPSTREAM_ERRORS
+import rate_limit_storage  # noqa: F401  (registra el esquema sqlite:// en limits)
+import metrics
+from metrics import timed
+
+load_dotenv()
 
 # Configuración inicial
 ALLOWED_EXTENSIONS = {'pdf', 'docx'}
-MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
+MAX_CONTENT_LENGTH = int(os.getenv('MAX_REQUEST_MB', 10)) * 1024 * 1024  # Cuerpos JSON y demás rutas
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', 128)) * 1024 * 1024  # Solo /process
+MAX_PROMPT_CHARS = 50000  # Límite de texto del documento en prompts sin recuperación
+
+# Las subidas mayores que este umbral se escriben en disco en lugar de quedarse en memoria
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_KB', 1024)) * 1024
+UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR') or None  # None: el directorio temporal del sistema
+
+
+class SpooledUploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_BYTES:
+            return io.BytesIO()
+        # Con nombre: la extracción de PDF en paralelo abre el archivo por ruta desde otros procesos
+        return tempfile.NamedTemporaryFile(dir=UPLOAD_TMP_DIR, prefix='upload-')
 
-load_dotenv()
 
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+# Permite desactivar los límites en pruebas de carga locales
+app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', '1') == '1'
+
+# Histogramas por etapa en /metrics; SERVER_TIMING=1 los expone también por solicitud
+metrics.init_app(app, server_timing=os.getenv('SERVER_TIMING', '0') == '1')
+
+# Directorio de datos compartidos entre workers (cachés, contadores de rate limit)
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'lector-cache'))
 
 # Configuración de CORS con opciones más seguras
 CORS(app, resources={
@@ -38,19 +89,35 @@ from flask_limiter.util import get_remote_address
 limiter = Limiter(
     app=app,
     key_func=lambda: get_remote_address() or request.headers.get('X-Forwarded-For', get_remote_address()),
-    storage_uri="memory://",  # Para producción usa Redis: "redis://localhost:6379"
-    strategy="fixed-window",  # Alternativa: "moving-window"
+    # SQLite local compartido por todos los workers; admite también "redis://host:6379"
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI', f"sqlite://{os.path.join(os.path.abspath(CACHE_DIR), 'ratelimit.sqlite3')}"),
+    # Ventana deslizante: pondera la ventana anterior y evita ráfagas dobles en el borde
+    strategy=os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter'),
     default_limits=["200 per day", "50 per hour", "10 per minute"]
 )
 
 from flask_limiter.errors import RateLimitExceeded
 
+@app.errorhandler(RequestEntityTooLarge)
+def handle_upload_too_large(e):
+    limit_mb = (request.max_content_length or MAX_CONTENT_LENGTH) // (1024 * 1024)
+    if request.endpoint == 'process_file':
+        return jsonify({"error": f"El archivo supera el tamaño máximo de {limit_mb} MB"}), 413
+    return jsonify({"error": f"La solicitud supera el tamaño máximo de {limit_mb} MB"}), 413
+
+
 @app.errorhandler(RateLimitExceeded)
 def handle_rate_limit_exceeded(e):
-    return jsonify({
+    response = jsonify({
         "error": "rate_limit_exceeded",
         "message": f"Has excedido el límite de solicitudes. Por favor espera. Límite: {e.description}"
-    }), 429
+    })
+    # Cuándo se libera la ventana: el cliente de lotes espera ese tiempo antes de reintentar
+    current = limiter.current_limit
+    if current is not None:
+        response.headers['Retry-After'] = str(max(1, math.ceil(current.reset_at - time.time())))
+    return response, 429
+
 
 # Configuración de Talisman con políticas de seguridad mejoradas
 csp = {
@@ -98,9 +165,282 @@ Talisman(
     session_cookie_secure=False  # False para desarrollo
 )
 
+# Recursos empaquetados por build_assets.py (nombre con hash, .gz y .br precomprimidos).
+# Solo con ASSET_BUNDLES=1 (lo fija el Dockerfile tras el build): static/dist no se
+# versiona y en desarrollo quedaría un paquete anterior a los fuentes. Sin build se
+# sirven los archivos originales de static/ como hasta ahora.
+ASSET_BUNDLES = os.getenv('ASSET_BUNDLES', '0') == '1'
+DIST_DIR = os.path.join(app.static_folder, 'dist')
+ASSET_SOURCE_DIRS = ('js', 'css')
+ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def newest_asset_source():
+    """Fecha de modificación más reciente de los fuentes que entran en los paquetes"""
+    newest = 0
+    for directory in ASSET_SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(app.static_folder, directory)):
+            for name in files:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+    return newest
+
+
+def load_asset_manifest():
+    if not ASSET_BUNDLES:
+        return {}
+    path = os.path.join(DIST_DIR, 'manifest.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        app.logger.warning("ASSET_BUNDLES=1 pero no hay static/dist/manifest.json: se sirven los fuentes")
+        return {}
+    if os.path.getmtime(path) < newest_asset_source():
+        app.logger.warning("static/dist es anterior a los fuentes (ejecuta build_assets.py): se sirven los fuentes")
+        return {}
+    return manifest
+
+
+asset_manifest = load_asset_manifest()
+
+
+@app.template_global()
+def asset_url(path):
+    entry = asset_manifest.get(path)
+    if entry is None:
+        return url_for('static', filename=path)
+    return url_for('hashed_asset', filename=entry['file'])
+
+
+@app.template_global()
+def asset_integrity(path):
+    entry = asset_manifest.get(path)
+    return entry['integrity'] if entry else None
+
+
+# Caché de documentos procesados (memoria por worker + disco compartido)
+upload_cache = TieredCache(
+    'uploads',
+    CACHE_DIR,
+    max_memory_bytes=int(os.getenv('UPLOAD_CACHE_MEMORY_MB', 64)) * 1024 * 1024,
+    max_disk_bytes=int(os.getenv('UPLOAD_CACHE_DISK_MB', 512)) * 1024 * 1024,
+    ttl=int(os.getenv('UPLOAD_CACHE_TTL', 7 * 24 * 3600))
+)
+# Cambiar la versión al modificar la extracción o la compactación invalida los párrafos guardados
+INGEST_VERSION = '3'
+
+# Sesiones de documento: texto ya sanitizado, referenciado por document_id
+document_store = TieredCache(
+    'documents',
+    CACHE_DIR,
+    max_memory_bytes=int(os.getenv('DOCUMENT_STORE_MEMORY_MB', 128)) * 1024 * 1024,
+    max_disk_bytes=int(os.getenv('DOCUMENT_STORE_DISK_MB', 1024)) * 1024 * 1024,
+    ttl=int(os.getenv('DOCUMENT_IDLE_TTL', 2 * 3600))
+)
+
+DOCUMENT_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Los párrafos se entregan por páginas: /process devuelve la primera y el
+# lector pide el resto con /documents/<id>/paragraphs al desplazarse
+PARAGRAPH_PAGE_SIZE = int(os.getenv('PARAGRAPH_PAGE_SIZE', 200))
+# Los párrafos de PDF más largos se cortan al ingerirlos para que cada página quede acotada
+PDF_PARAGRAPH_MAX_CHARS = int(os.getenv('PDF_PARAGRAPH_MAX_CHARS', 2000))
+PARAGRAPH_PAGE_MAX = 1000
+GZIP_MIN_BYTES = 1024
+
+# Recuperación de fragmentos para el chat (BM25 sobre el documento completo)
+RETRIEVAL_CHUNK_CHARS = int(os.getenv('RETRIEVAL_CHUNK_CHARS', 1500))
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', 6))
+RETRIEVAL_INDEX_CACHE_SIZE = int(os.getenv('RETRIEVAL_INDEX_CACHE_SIZE', 32))
+
+retrieval_indexes = OrderedDict()  # document_id -> BM25Index (por worker)
+retrieval_indexes_lock = threading.Lock()
+
+# Caché de respuestas de Gemini para /suggestions y /complement (SQLite compartido)
+response_cache = SQLiteCache(
+    os.path.join(CACHE_DIR, 'responses.sqlite3'),
+    'responses',
+    ttl=int(os.getenv('LLM_CACHE_TTL', 24 * 3600)),
+    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', 10000))
+)
+
+def run_blocking(func, *args):
+    """Ejecuta func(*args) en un hilo del sistema si el worker es gevent.
+
+    Con gevent todas las solicitudes del worker comparten un hilo: el trabajo
+    de CPU de la ingesta (parseo, compactación, bleach, BM25) las detendría a
+    todas y podría superar el timeout de gunicorn. El threadpool del hub lo
+    ejecuta aparte mientras esta solicitud espera sin bloquear a las demás.
+    `func` no debe crear hilos ni greenlets. Se ejecuta con una copia del
+    contexto actual, así que ve la solicitud y `g` (Server-Timing incluido).
+    """
+    if monkey.is_module_patched('threading'):
+        return gevent.get_hub().threadpool.spawn(contextvars.copy_context().run, func, *args).get()
+    return func(*args)
+
+
+# Extracción de PDFs en paralelo por páginas (0 trabajadores = en serie). Cada
+# worker de gunicorn tiene su propio pool: por defecto se reparten los núcleos
+# entre los GUNICORN_WORKERS procesos en vez de crear cpu_count pools de cpu_count
+PDF_EXTRACT_WORKERS = int(os.getenv(
+    'PDF_EXTRACT_WORKERS',
+    max(1, (os.cpu_count() or 1) // int(os.getenv('GUNICORN_WORKERS', os.cpu_count() or 1)))
+))
+pdf_extractor = PdfExtractor(
+    workers=PDF_EXTRACT_WORKERS,
+    page_timeout=float(os.getenv('PDF_PAGE_TIMEOUT', 10)),
+    min_parallel_pages=int(os.getenv('PDF_PARALLEL_MIN_PAGES', 16)),
+    offload=run_blocking
+)
+
+# Ingesta en segundo plano (/process?async=1); el estado se comparte vía SQLite
+ingest_jobs = JobQueue(
+    SQLiteCache(os.path.join(CACHE_DIR, 'jobs.sqlite3'), 'jobs', ttl=3600, max_entries=1000),
+    workers=int(os.getenv('INGEST_WORKERS', 2)),
+    max_pending=int(os.getenv('INGEST_MAX_PENDING', 8))
+)
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+UPLOAD_TOKEN_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Sugerencias precalculadas tras la ingesta, guardadas junto a la sesión del
+# documento (mismo id y TTL) para que /suggestions responda sin esperar a Gemini
+SPECULATIVE_SUGGESTIONS = os.getenv('SPECULATIVE_SUGGESTIONS', '1') == '1'
+speculative_suggestions = SpeculativeQueue(
+    SQLiteCache(os.path.join(CACHE_DIR, 'speculative.sqlite3'), 'suggestions',
+                ttl=int(os.getenv('DOCUMENT_IDLE_TTL', 2 * 3600)), max_entries=10000),
+    workers=int(os.getenv('SPECULATIVE_WORKERS', 1)),
+    max_pending=int(os.getenv('SPECULATIVE_MAX_PENDING', 16)),
+    on_event=metrics.record_speculation
+)
+
+# Llamadas a Gemini por minuto para complementos, compartidas por /complement y /complement/batch
+COMPLEMENT_MAX_PROMPTS = int(os.getenv('COMPLEMENT_RATE_LIMIT', 5))
+COMPLEMENT_RATE_LIMIT = f"{COMPLEMENT_MAX_PROMPTS} per minute"
+
+# Complementos en lote: párrafos cortos empaquetados y llamadas en paralelo acotadas
+COMPLEMENT_BATCH_MAX_ITEMS = int(os.getenv('COMPLEMENT_BATCH_MAX_ITEMS', 40))
+COMPLEMENT_BATCH_CONCURRENCY = int(os.getenv('COMPLEMENT_BATCH_CONCURRENCY', 4))
+COMPLEMENT_PACK_THRESHOLD = 600  # caracteres: por debajo, el párrafo se empaqueta con otros
+COMPLEMENT_PACK_MAX_CHARS = 2400
+COMPLEMENT_PACK_MAX_ITEMS = 4
+
+# Cambiar la versión al modificar el prompt invalida las respuestas guardadas
+SUGGESTIONS_PROMPT_VERSION = '1'
+COMPLEMENT_PROMPT_VERSION = '1'
+
+
+class DocumentNotFound(Exception):
+    """El document_id no existe o la sesión expiró por inactividad"""
+
+
+@app.errorhandler(DocumentNotFound)
+def handle_document_not_found(e):
+    return jsonify({
+        "error": "document_not_found",
+        "message": "El documento expiró. Vuelve a subirlo."
+    }), 404
+
+
 # Configuración de Gemini
+GEMINI_MODEL = 'gemini-1.5-flash'
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', 60))  # segundos por llamada
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 32))  # llamadas simultáneas por worker
+GEMINI_QUEUE_TIMEOUT = float(os.getenv('GEMINI_QUEUE_TIMEOUT', 10))  # espera máxima por un turno
+
 gemini_api_key = os.getenv('GEMINI_API_KEY')
-genai.configure(api_key=gemini_api_key)
+gemini_options = {}
+if os.getenv('GEMINI_API_ENDPOINT'):
+    # Permite apuntar a un servidor local (p. ej. benchmarks/fake_gemini.py)
+    gemini_options['client_options'] = {'api_endpoint': os.getenv('GEMINI_API_ENDPOINT')}
+# REST usa requests, que gevent puede parchear; gRPC bloquearía el worker
+genai.configure(api_key=gemini_api_key, transport=os.getenv('GEMINI_TRANSPORT', 'rest'), **gemini_options)
+
+# Un único modelo por worker: reutiliza el cliente y su pool de conexiones
+model = genai.GenerativeModel(GEMINI_MODEL)
+gemini_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+
+
+class UpstreamBusy(Exception):
+    """No hubo turno libre para llamar a Gemini dentro del tiempo de espera"""
+
+
+@app.errorhandler(UpstreamBusy)
+def handle_upstream_busy(e):
+    return jsonify({
+        "error": "upstream_busy",
+        "message": "El asistente está ocupado. Inténtalo en unos segundos."
+    }), 503
+
+
+def generate_content(prompt, stream=False, context_model=None):
+    """Llama a Gemini con concurrencia acotada y tiempo máximo por llamada.
+
+    Con stream=True devuelve un generador que ocupa el turno mientras se consume.
+    `context_model` sustituye al modelo global por uno ligado a un contexto cacheado.
+    """
+    if stream:
+        return _generate_stream(prompt, context_model or model)
+
+    if not gemini_slots.acquire(timeout=GEMINI_QUEUE_TIMEOUT):
+        raise UpstreamBusy()
+    try:
+        response = (context_model or model).generate_content(
+            prompt, request_options={'timeout': GEMINI_TIMEOUT})
+    finally:
+        gemini_slots.release()
+    metrics.record_llm_call('generate', len(prompt), len(response.text))
+    return response
+
+
+# Solicitudes idénticas simultáneas (p. ej. una clase abriendo el mismo documento)
+# comparten una sola llamada a Gemini, también entre workers
+coalescer = SingleFlight(
+    os.path.join(CACHE_DIR, 'singleflight'),
+    SQLiteCache(os.path.join(CACHE_DIR, 'singleflight.sqlite3'), 'inflight',
+                ttl=int(os.getenv('SINGLEFLIGHT_RESULT_TTL', 10)), max_entries=1000),
+    wait_timeout=GEMINI_TIMEOUT
+)
+
+# Caché de contexto en Gemini para el chat: el documento se envía una vez por TTL
+# y cada turno solo la pregunta. Gemini exige un mínimo de tokens por contexto
+# (32k en 1.5), así que los documentos pequeños siguen usando la recuperación top-k.
+CONTEXT_CACHE_ENABLED = os.getenv('CONTEXT_CACHE_ENABLED', '0') == '1'
+CONTEXT_CACHE_TTL = int(os.getenv('CONTEXT_CACHE_TTL', 3600))
+context_cache = ContextCache(
+    SQLiteCache(os.path.join(CACHE_DIR, 'context_caches.sqlite3'), 'contexts',
+                ttl=max(60, CONTEXT_CACHE_TTL - 60), max_entries=10000),
+    coalescer,
+    model_name=os.getenv('CONTEXT_CACHE_MODEL', 'models/gemini-1.5-flash-002'),  # requiere versión fija
+    ttl=CONTEXT_CACHE_TTL,
+    min_chars=int(os.getenv('CONTEXT_CACHE_MIN_CHARS', 32768 * 4))
+)
+
+
+def generate_text(prompt, context_model=None):
+    """Texto generado para el prompt, agrupando llamadas idénticas en curso"""
+    context = context_model.cached_content if context_model is not None else ''
+    key = content_hash(GEMINI_MODEL, context, ' '.join(prompt.split()))
+    # Incluye la espera en cola y, para llamadas agrupadas, la espera al líder
+    with timed('llm'):
+        return coalescer.do(key, lambda: generate_content(prompt, context_model=context_model).text)
+
+
+def _generate_stream(prompt, target_model):
+    if not gemini_slots.acquire(timeout=GEMINI_QUEUE_TIMEOUT):
+        raise UpstreamBusy()
+    start = time.perf_counter()
+    response_chars = 0
+    try:
+        for chunk in target_model.generate_content(prompt, stream=True,
+                                                   request_options={'timeout': GEMINI_TIMEOUT}):
+            response_chars += len(chunk.text)
+            yield chunk
+    finally:
+        gemini_slots.release()
+        metrics.record_stage('llm', time.perf_counter() - start)
+        metrics.record_llm_call('stream', len(prompt), response_chars)
 
 
 # Middleware para filtrar solicitudes malformadas
@@ -117,9 +457,65 @@ def filter_bad_requests():
     if request.method == 'POST' and request.path != '/process' and not request.is_json:
         return jsonify({"error": "Se requiere Content-Type: application/json"}), 415
 
+
+@app.before_request
+def limit_request_size():
+    # Solo la subida de documentos admite cuerpos grandes (van a disco); las rutas JSON
+    # leen el cuerpo entero en memoria y lo sanitizan, así que conservan el límite global
+    if request.endpoint == 'process_file':
+        request.max_content_length = MAX_UPLOAD_BYTES
+    # Rechazar antes de la vista: sus `except Exception` convertirían el 413 en un 500
+    if request.content_length is not None and request.content_length > request.max_content_length:
+        raise RequestEntityTooLarge()
+
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', max_upload_mb=MAX_UPLOAD_BYTES // (1024 * 1024))
+
+
+@app.route('/assets/<path:filename>')
+@limiter.exempt
+def hashed_asset(filename):
+    """Recurso con hash en el nombre: su contenido no cambia, se cachea un año"""
+    path = safe_join(DIST_DIR, filename)
+    if path is None or filename.endswith(('.gz', '.br', '.json')) or not os.path.isfile(path):
+        return jsonify({"error": "Recurso no encontrado"}), 404
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ASSET_ENCODINGS:
+        if request.accept_encodings[name] > 0 and os.path.isfile(path + suffix):
+            path, encoding = path + suffix, name
+            break
+
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@app.route('/stats')
+def stats():
+    """Contadores de caché del worker que atiende la solicitud"""
+    return jsonify({
+        "upload_cache": upload_cache.stats(),
+        "document_store": document_store.stats(),
+        "response_cache": response_cache.stats(),
+        "singleflight": coalescer.stats(),
+        "context_cache": context_cache.stats(),
+        "speculative_suggestions": speculative_suggestions.stats()
+    })
+
+
+@app.route('/metrics')
+@limiter.exempt
+def prometheus_metrics():
+    """Histogramas por etapa en formato Prometheus, sumados entre workers"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
 
 def validate_source(url):
     """Valida que las URLs de fuentes sean seguras y de dominios confiables"""
@@ -179,8 +575,9 @@ def allowed_file(filename):
 
 def validate_file_type(file_stream, filename):
     """Valida el tipo MIME real del archivo"""
-    mime = magic.Magic(mime=True)
-    file_mime = mime.from_buffer(file_stream.read(2048))
+    with timed('libmagic'):
+        mime = magic.Magic(mime=True)
+        file_mime = mime.from_buffer(file_stream.read(2048))
     file_stream.seek(0)  # Rebobinar para no afectar el procesamiento posterior
 
     valid_mimes = {
@@ -192,7 +589,8 @@ def validate_file_type(file_stream, filename):
     return file_mime == valid_mimes.get(ext)
 
 
-def sanitize_text(text):
+@timed('sanitize_text')
+def sanitize_text(text, max_length=MAX_PROMPT_CHARS):
     if not text:
         return ""
 
@@ -205,9 +603,93 @@ def sanitize_text(text):
     # Eliminar caracteres no imprimibles excepto saltos de línea
     cleaned = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', cleaned)
 
-    # Limitar longitud
-    return cleaned[:50000]
+    # Limitar longitud (None conserva el texto completo)
+    return cleaned[:max_length]
+
+@timed('register_document')
+def register_document(paragraphs):
+    """Guarda el documento sanitizado en el almacén de sesiones y devuelve su id"""
+    texts = [p['text'] for p in paragraphs]
+    document_text = sanitize_text('\n\n'.join(texts), max_length=None)
+    document_id = content_hash(document_text)[:32]
+
+    document = document_store.get(document_id)
+    if document is None:
+        document = {
+            "text": document_text,
+            "paragraphs": texts,
+            "chunks": chunk_spans(document_text, RETRIEVAL_CHUNK_CHARS)
+        }
+        document_store.set(document_id, document)
+
+    # Construir el índice una sola vez, durante la ingesta
+    get_retrieval_index(document_id, document)
+    return document_id
+
+
+def load_document(document_id):
+    """Recupera un documento registrado o lanza DocumentNotFound"""
+    if not isinstance(document_id, str) or not DOCUMENT_ID_PATTERN.match(document_id):
+        raise DocumentNotFound()
+    document = document_store.get(document_id)
+    if document is None:
+        raise DocumentNotFound()
+    return document
+
+
+def paragraph_page(document_id, texts, offset=0, limit=PARAGRAPH_PAGE_SIZE):
+    """Rango de párrafos del documento con el total, para paginar en el cliente"""
+    return {
+        "document_id": document_id,
+        "total_paragraphs": len(texts),
+        "offset": offset,
+        "paragraphs": [{"text": text} for text in texts[offset:offset + limit]]
+    }
+
+
+def compressed_json(payload):
+    """jsonify comprimido con gzip si el cliente lo acepta y el cuerpo lo justifica"""
+    response = jsonify(payload)
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip'] > 0 and response.content_length >= GZIP_MIN_BYTES:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def resolve_document_text(data):
+    """Obtiene el texto sanitizado desde document_id o, por compatibilidad, desde document_text"""
+    if data.get('document_id'):
+        return load_document(data['document_id'])['text'][:MAX_PROMPT_CHARS]
+    return sanitize_text(data.get('document_text', '').strip())
+
+
+def get_retrieval_index(document_id, document):
+    """Devuelve el índice BM25 del documento, construyéndolo si este worker no lo tiene"""
+    with retrieval_indexes_lock:
+        index = retrieval_indexes.get(document_id)
+        if index is not None:
+            retrieval_indexes.move_to_end(document_id)
+            return index
+
+    text = document['text']
+    index = BM25Index([text[start:end] for start, end in document['chunks']])
+
+    with retrieval_indexes_lock:
+        retrieval_indexes[document_id] = index
+        while len(retrieval_indexes) > RETRIEVAL_INDEX_CACHE_SIZE:
+            retrieval_indexes.popitem(last=False)
+    return index
+
+
+def select_passages(document_id, document, question):
+    """Texto con los fragmentos más relevantes para la pregunta, en orden del documento"""
+    index = get_retrieval_index(document_id, document)
+    best = index.top_k(question, RETRIEVAL_TOP_K)
+    return '\n\n[...]\n\n'.join(index.chunks[i] for i in best)
 
+
+@timed('validate_pdf')
 def validate_pdf(file_stream):
     try:
         PyPDF2.PdfReader(file_stream)
@@ -215,258 +697,747 @@ def validate_pdf(file_stream):
     except PyPDF2.PdfReadError:
         return False
 
+@timed('validate_docx')
 def validate_docx(file_stream):
-    try:
-        Document(file_stream)
-        return True
-    except:
-        return False
+    return is_docx(file_stream)
+
 
+def upload_source(file_stream):
+    """Origen para PdfExtractor: la ruta si la subida está en disco (la extracción en
+    paralelo la abre por ruta), los bytes si es pequeña y ya está en memoria"""
+    if isinstance(file_stream, io.BytesIO):
+        return file_stream.getvalue()
+    path = getattr(file_stream, 'name', None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return path
+    return file_stream
 
-def extract_text(file):
-    if file.filename.endswith('.docx'):
-        doc = Document(io.BytesIO(file.read()))
-        return [{"text": p.text} for p in doc.paragraphs if p.text.strip()]
-    elif file.filename.endswith('.pdf'):
-        pdf = PyPDF2.PdfReader(file)
-        text = []
-        for page in pdf.pages:
-            text.append(page.extract_text())
+
+def docx_paragraphs(file_stream):
+    file_stream.seek(0)
+    return [{"text": text} for text in iter_paragraphs(file_stream) if text.strip()]
+
+
+@timed('extract_text')
+def extract_text(file_stream, filename, on_progress=None):
+    """Párrafos del documento leídos desde el archivo, sin copiarlo a memoria"""
+    if filename.endswith('.docx'):
+        return run_blocking(docx_paragraphs, file_stream)
+    elif filename.endswith('.pdf'):
+        text = pdf_extractor.extract(upload_source(file_stream), on_progress)
         return [{"text": t} for t in text if t.strip()]
     return []
 
 
+# Reglas del asistente de chat; también son la instrucción de sistema del contexto cacheado
+CHAT_INSTRUCTIONS = (
+    "Actúa como un asistente académico especializado en analizar documentos. "
+    "Responde la pregunta del usuario basándote PRINCIPALMENTE en el contenido "
+    "del documento proporcionado. Sigue estas reglas:\n\n"
+
+    "1) SI la respuesta está DIRECTAMENTE en el documento:\n"
+    "- Extrae la información precisa\n"
+    "- Cita el fragmento relevante entre comillas \"\"\n"
+    "- Responde de manera concisa\n\n"
+
+    "2) SI necesitas COMPLEMENTAR con información externa:\n"
+    "- Primero indica claramente \"Según el documento:\"\n"
+    "- Luego añade \"Información adicional:\" con datos relevantes\n"
+    "- Proporciona EXACTAMENTE 1 referencia académica confiable\n\n"
+
+    "3) SI la pregunta NO está relacionada con el documento:\n"
+    "- Responde amablemente que la respuesta a esa pregunta no se encuentra en el documento subido\n"
+    "- Responde la pregunta de manera concisa añadiendo que según (inserte la fuente aquí) \n\n"
+)
+
+
+def build_chat_prompt(data):
+    """Valida la solicitud de chat y arma el prompt.
+
+    Devuelve (prompt, None) o (None, respuesta de error).
+    """
+    question = data.get('question', '').strip()
+
+    if data.get('document_id'):
+        document = load_document(data['document_id'])
+        document_text = document['text']
+    else:
+        document = None
+        document_text = sanitize_text(data.get('document_text', '').strip())
+
+    if not document_text:
+        return None, (jsonify({"error": "Texto del documento vacío"}), 400)
+
+    # Sanitizar entradas
+    question = sanitize_text(question)
+    if question == "":
+        return None, (jsonify({
+            "answer": 'Ingrese una pregunta válida',
+            "external_source": None  # None si no es válida
+        }), 400)
+
+    # Con sesión de documento solo se envían los fragmentos relevantes
+    document_label = "DOCUMENTO"
+    if document is not None:
+        document_text = select_passages(data['document_id'], document, question)
+        document_label = "FRAGMENTOS RELEVANTES DEL DOCUMENTO"
+
+    prompt = (
+        f"{CHAT_INSTRUCTIONS}"
+        f"{document_label}:\n{document_text}\n\n"
+        f"PREGUNTA DEL USUARIO:\n{question}"
+    )
+    return prompt, None
+
+
+def build_context_turn(data):
+    """(modelo con el documento en caché de contexto, prompt solo con la pregunta) o None.
+
+    None si la caché de contexto está desactivada, la solicitud no trae
+    document_id o Gemini no admite el contexto; se usa entonces el prompt completo.
+    """
+    if not CONTEXT_CACHE_ENABLED or not data.get('document_id'):
+        return None
+    document = load_document(data['document_id'])
+    context_model = context_cache.model_for(
+        data['document_id'], CHAT_INSTRUCTIONS, f"DOCUMENTO:\n{document['text']}")
+    if context_model is None:
+        return None
+    question = sanitize_text(data.get('question', '').strip())
+    return context_model, f"PREGUNTA DEL USUARIO:\n{question}"
+
+
+def find_external_source(answer):
+    """Extrae y valida la fuente externa citada en la respuesta del chat"""
+    if "Información adicional:" not in answer:
+        return None
+
+    source_match = re.search(r'Fuente:\s*(.+?)\s*(\(https?://[^\s]+)?', answer)
+    if source_match:
+        url = source_match.group(2)[1:-1] if source_match.group(2) else None
+        if url and validate_source(url):  # <- VALIDACIÓN DE URL
+            return {
+                "name": sanitize_text(source_match.group(1))[:200],
+                "url": url[:500]
+            }
+    return None
+
+
+def cached_response(payload, hit):
+    """Respuesta JSON con la cabecera X-Cache indicando si vino de la caché"""
+    response = jsonify(payload)
+    response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
+def sse_event(event, payload):
+    """Formatea un evento Server-Sent Events con datos JSON"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
 @app.route('/chat', methods=['POST'])
 @limiter.limit("10 per minute")
 def chat_with_document():
     try:
         data = request.get_json()
-        question = data.get('question', '').strip()
-        document_text = data.get('document_text', '').strip()
-
-        if not document_text:
-            return jsonify({"error": "Texto del documento vacío"}), 400
-
-        # Sanitizar entradas
-        question = sanitize_text(question)
-        if question == "":
-            return jsonify({
-                "answer": 'Ingrese una pregunta válida',
-                "external_source": None  # None si no es válida
-            }), 400
-        document_text = sanitize_text(document_text)
-
-        model = genai.GenerativeModel('gemini-1.5-flash')
-
-        prompt = (
-            "Actúa como un asistente académico especializado en analizar documentos. "
-            "Responde la pregunta del usuario basándote PRINCIPALMENTE en el contenido "
-            "del documento proporcionado. Sigue estas reglas:\n\n"
-
-            "1) SI la respuesta está DIRECTAMENTE en el documento:\n"
-            "- Extrae la información precisa\n"
-            "- Cita el fragmento relevante entre comillas \"\"\n"
-            "- Responde de manera concisa\n\n"
-
-            "2) SI necesitas COMPLEMENTAR con información externa:\n"
-            "- Primero indica claramente \"Según el documento:\"\n"
-            "- Luego añade \"Información adicional:\" con datos relevantes\n"
-            "- Proporciona EXACTAMENTE 1 referencia académica confiable\n\n"
-
-            "3) SI la pregunta NO está relacionada con el documento:\n"
-            "- Responde amablemente que la respuesta a esa pregunta no se encuentra en el documento subido\n"
-            "- Responde la pregunta de manera concisa añadiendo que según (inserte la fuente aquí) \n\n"
-
-            f"DOCUMENTO:\n{document_text}\n\n"
-            f"PREGUNTA DEL USUARIO:\n{question}"
-        )
-
-        response = model.generate_content(prompt)
+        prompt, error = build_chat_prompt(data)
+        if error:
+            return error
+
+        answer = None
+        context = build_context_turn(data)
+        if context is not None:
+            context_model, turn_prompt = context
+            try:
+                answer = generate_text(turn_prompt, context_model=context_model)
+            except UPSTREAM_ERRORS as e:
+                # El contexto pudo caducar o borrarse antes de tiempo: repetir con el prompt completo
+                app.logger.warning(f"Contexto cacheado falló, se usa el prompt completo: {str(e)}")
+                context_cache.invalidate(data['document_id'])
+        if answer is None:
+            answer = generate_text(prompt)
 
         # Procesar la respuesta para identificar fuentes externas
-        answer = response.text
-        external_source = None
-
-        if "Información adicional:" in answer:
-            source_match = re.search(r'Fuente:\s*(.+?)\s*(\(https?://[^\s]+)?', answer)
-            if source_match:
-                url = source_match.group(2)[1:-1] if source_match.group(2) else None
-                if url and validate_source(url):  # <- VALIDACIÓN DE URL
-                    external_source = {
-                        "name": sanitize_text(source_match.group(1))[:200],
-                        "url": url[:500]
-                    }
 
         return jsonify({
             "answer": answer,
-            "external_source": external_source  # None si no es válida
+            "external_source": find_external_source(answer)  # None si no es válida
         })
 
+    except (DocumentNotFound, UpstreamBusy):
+        raise
     except Exception as e:
         app.logger.error(f"Error en chat: {str(e)}")
         return jsonify({"error": "Error en el servidor"}), 500
 
 
+@app.route('/chat/stream', methods=['POST'])
+@limiter.limit("10 per minute")
+def chat_with_document_stream():
+    """Variante de /chat que envía la respuesta por SSE a medida que se genera.
+
+    Eventos: `token` con cada fragmento de texto, y al final `done` con la
+    respuesta completa y la fuente externa validada (o `error`).
+    """
+    try:
+        data = request.get_json()
+        prompt, error = build_chat_prompt(data)
+        if error:
+            return error
+        context = build_context_turn(data)
+    except DocumentNotFound:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error en chat: {str(e)}")
+        return jsonify({"error": "Error en el servidor"}), 500
+
+    def answer_chunks():
+        if context is not None:
+            context_model, turn_prompt = context
+            started = False
+            try:
+                for chunk in generate_content(turn_prompt, stream=True, context_model=context_model):
+                    started = True
+                    yield chunk
+                return
+            except UPSTREAM_ERRORS as e:
+                # Solo se puede repetir si aún no se envió nada al cliente
+                if started:
+                    raise
+                app.logger.warning(f"Contexto cacheado falló, se usa el prompt completo: {str(e)}")
+                context_cache.invalidate(data['document_id'])
+        yield from generate_content(prompt, stream=True)
+
+    def generate():
+        parts = []
+        try:
+            for chunk in answer_chunks():
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield sse_event('token', {"text": chunk.text})
+
+            answer = ''.join(parts)
+            yield sse_event('done', {
+                "answer": answer,
+                "external_source": find_external_source(answer)
+            })
+        except UpstreamBusy:
+            yield sse_event('error', {"error": "El asistente está ocupado. Inténtalo en unos segundos."})
+        except Exception as e:
+            app.logger.error(f"Error en chat (stream): {str(e)}")
+            yield sse_event('error', {"error": "Error en el servidor"})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Evita que el proxy acumule la respuesta
+    })
+
+
+def compute_suggestions(document_text):
+    """Devuelve (payload, cache_hit) con las preguntas sugeridas para el documento"""
+    cache_key = content_hash(GEMINI_MODEL, 'suggestions', SUGGESTIONS_PROMPT_VERSION, document_text)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached, True
+
+    response_text = generate_text(
+        "Genera exactamente 5 preguntas frecuentes breves (máximo 15 palabras cada una) "
+        "basadas en este documento. Devuélvelas como una lista JSON:\n\n"
+        f"{document_text}"
+    )
+
+    # Extraer las preguntas de la respuesta
+    questions = []
+    app.logger.debug(f"Sugerencias de Gemini: {response_text}")
+    if response_text.startswith('[') and response_text.endswith(']'):
+        try:
+            questions = json.loads(response_text)
+        except:
+            # Si falla el parseo, intentar extraer preguntas de otro formato
+            questions = [q.strip() for q in response_text.split('\n') if q.strip()]
+    else:
+        questions = [q.strip() for q in response_text.split('\n') if q.strip()]
+
+    payload = {"questions": questions[2:7]}
+    if payload["questions"]:
+        response_cache.set(cache_key, payload)
+    return payload, False
+
+
+def speculate_suggestions(document_id):
+    """Encola el cálculo de las sugerencias del documento recién registrado.
+
+    Devuelve el testigo de esta subida para cancelarlo (document_id es el hash
+    del contenido y lo comparten todos los que suben el mismo archivo), o None
+    si no hay nada pendiente que cancelar.
+    """
+    if not SPECULATIVE_SUGGESTIONS:
+        return None
+
+    def compute():
+        # Mismo texto que usará /suggestions, y por tanto la misma clave de caché y de singleflight
+        payload, _ = compute_suggestions(resolve_document_text({"document_id": document_id}))
+        if not payload["questions"]:
+            # Igual que en la caché de respuestas: una lista vacía no se guarda
+            raise ValueError("Gemini no devolvió preguntas")
+        return payload
+
+    token = secrets.token_hex(16)
+    return token if speculative_suggestions.submit(document_id, compute, token) else None
+
+
 @app.route('/suggestions', methods=['POST'])
 def generate_questions():
     try:
         data = request.get_json()
-        document_text = data.get('document_text', '').strip()
+
+        # Resultado precalculado al subir el documento
+        if data.get('document_id'):
+            precomputed = speculative_suggestions.result(data['document_id'])
+            if precomputed is not None:
+                metrics.record_speculation('used')
+                return cached_response(precomputed, hit=True)
+            if speculative_suggestions.status(data['document_id']) in ('queued', 'running'):
+                # Aún no está listo: si ya está en curso, singleflight evita repetir la llamada
+                metrics.record_speculation('missed')
+
+        document_text = resolve_document_text(data)
 
         if not document_text:
             return jsonify({"error": "Texto del documento vacío"}), 400
 
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        payload, hit = compute_suggestions(document_text)
+        return cached_response(payload, hit=hit)
 
-        response = model.generate_content(
-            "Genera exactamente 5 preguntas frecuentes breves (máximo 15 palabras cada una) "
-            "basadas en este documento. Devuélvelas como una lista JSON:\n\n"
-            f"{document_text}"
-        )
+    except (DocumentNotFound, UpstreamBusy):
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Extraer las preguntas de la respuesta
-        questions = []
-        print(response.text)
-        if response.text.startswith('[') and response.text.endswith(']'):
-            try:
-                questions = json.loads(response.text)
-            except:
-                # Si falla el parseo, intentar extraer preguntas de otro formato
-                questions = [q.strip() for q in response.text.split('\n') if q.strip()]
-        else:
-            questions = [q.strip() for q in response.text.split('\n') if q.strip()]
 
-        return jsonify({"questions": questions[2:7]})
+class IngestError(Exception):
+    """El archivo no superó la validación; el mensaje se muestra al usuario"""
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    def __init__(self, message):
+        super().__init__(message)
+        self.public_message = message
 
 
-@app.route('/process', methods=['POST'])
-@limiter.limit("5 per minute")
-def process_file():
+def ingest_document(file_stream, filename, on_progress=None):
+    """Valida y extrae el documento, lo registra y devuelve (payload, cache_hit).
+
+    `file_stream` debe admitir seek. Lanza IngestError si el archivo se rechaza.
+    """
+    # Buscar en caché por el hash del contenido (evita libmagic y el parseo completo)
+    ext = os.path.splitext(filename)[1].lower()
+    with timed('upload_hash'):
+        cache_key = run_blocking(content_hash, ext, INGEST_VERSION, file_stream)
+    file_stream.seek(0)
+
+    cached = upload_cache.get(cache_key)
+    if cached is not None:
+        document_id = run_blocking(register_document, cached)
+        return document_summary(document_id, cached, speculate_suggestions(document_id)), True
+
+    # Validar tipo MIME real
+    with timed('libmagic'):
+        mime = magic.Magic(mime=True)
+        file_mime = mime.from_buffer(file_stream.read(2048))
+    file_stream.seek(0)  # Rebobinar para procesar después
+
+    valid_mimes = {
+        '.pdf': 'application/pdf',
+        '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    }
+
+    if file_mime != valid_mimes.get(ext):
+        app.logger.error(f"MIME type no coincide: {file_mime} para extensión {ext}")
+        raise IngestError("Tipo de archivo no válido")
+
+    # Validar estructura del archivo
+    if ext == '.pdf' and not run_blocking(validate_pdf, file_stream):
+        raise IngestError("El archivo PDF está corrupto")
+    elif ext == '.docx' and not validate_docx(file_stream):
+        raise IngestError("El archivo DOCX está corrupto")
+
+    file_stream.seek(0)
     try:
-        # Verificar si se envió el archivo correctamente
-        if 'file' not in request.files:
-            app.logger.error("No se encontró el campo 'file' en la solicitud")
-            return jsonify({"error": "No se proporcionó archivo"}), 400
+        paragraphs = extract_text(file_stream, filename, on_progress)
+    except DocxError:
+        raise IngestError("El archivo DOCX está corrupto")
+
+    # Asegurarse de devolver un array incluso para PDFs
+    if ext == '.pdf':
+        # Quitar encabezados, pies, números de página y cortes de línea antes de
+        # convertir el texto en párrafos: todo ello se enviaría a Gemini en cada prompt
+        with timed('compact_text'):
+            full_text, savings = run_blocking(compact_pages, [p['text'] for p in paragraphs if p['text']])
+        metrics.record_compaction(savings['chars_before'], savings['chars_after'])
+        app.logger.info(
+            f"Compactación de {filename}: {savings['chars_before']} -> {savings['chars_after']} "
+            f"caracteres (~{savings['tokens_saved']} tokens menos, "
+            f"{savings['boilerplate_lines']} líneas repetidas, {savings['hyphenations']} guiones)"
+        )
+        # Un PDF sin líneas en blanco daría un único párrafo con todo el documento
+        paragraphs = [{'text': full_text[start:end]}
+                      for start, end in paragraph_spans(full_text, PDF_PARAGRAPH_MAX_CHARS)]
 
-        file = request.files['file']
+    upload_cache.set(cache_key, paragraphs)
 
-        # Verificar nombre de archivo
-        if file.filename == '':
-            app.logger.error("Nombre de archivo vacío")
-            return jsonify({"error": "Nombre de archivo vacío"}), 400
+    document_id = run_blocking(register_document, paragraphs)
+    return document_summary(document_id, paragraphs, speculate_suggestions(document_id)), False
 
-        # Validar extensión
-        if not allowed_file(file.filename):
-            app.logger.error(f"Tipo de archivo no permitido: {file.filename}")
-            return jsonify({"error": "Solo se permiten archivos PDF o DOCX"}), 400
 
-        # Validar tipo MIME real
-        mime = magic.Magic(mime=True)
-        file_stream = file.stream.read(2048)
-        file_mime = mime.from_buffer(file_stream)
-        file.stream.seek(0)  # Rebobinar para procesar después
+def document_summary(document_id, paragraphs, upload_token=None):
+    """Respuesta de /process: metadatos del documento y la primera página de párrafos"""
+    texts = [p['text'] for p in paragraphs]
+    payload = paragraph_page(document_id, texts)
+    payload.update(total_chars=sum(len(text) for text in texts), page_size=PARAGRAPH_PAGE_SIZE)
+    if upload_token:
+        # Para POST /documents/<id>/cancel: solo retira el interés de esta subida
+        payload['upload_token'] = upload_token
+    return payload
 
-        valid_mimes = {
-            '.pdf': 'application/pdf',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        }
 
-        ext = os.path.splitext(file.filename)[1].lower()
-        if file_mime != valid_mimes.get(ext):
-            app.logger.error(f"MIME type no coincide: {file_mime} para extensión {ext}")
-            return jsonify({"error": "Tipo de archivo no válido"}), 400
+def get_uploaded_file():
+    """Devuelve el archivo subido o una respuesta de error si no es válido"""
+    # Verificar si se envió el archivo correctamente
+    if 'file' not in request.files:
+        app.logger.error("No se encontró el campo 'file' en la solicitud")
+        return None, (jsonify({"error": "No se proporcionó archivo"}), 400)
+
+    file = request.files['file']
 
-        # Validar estructura del archivo
-        if ext == '.pdf' and not validate_pdf(file.stream):
-            file.stream.seek(0)
-            return jsonify({"error": "El archivo PDF está corrupto"}), 400
-        elif ext == '.docx' and not validate_docx(file.stream):
-            file.stream.seek(0)
-            return jsonify({"error": "El archivo DOCX está corrupto"}), 400
+    # Verificar nombre de archivo
+    if file.filename == '':
+        app.logger.error("Nombre de archivo vacío")
+        return None, (jsonify({"error": "Nombre de archivo vacío"}), 400)
 
-        file.stream.seek(0)
-        paragraphs = extract_text(file)
+    # Validar extensión
+    if not allowed_file(file.filename):
+        app.logger.error(f"Tipo de archivo no permitido: {file.filename}")
+        return None, (jsonify({"error": "Solo se permiten archivos PDF o DOCX"}), 400)
 
-        # Asegurarse de devolver un array incluso para PDFs
-        if file.filename.endswith('.pdf'):
-            # Para PDFs, convertimos el texto en párrafos
-            full_text = ' '.join([p['text'] for p in paragraphs if p['text']])
-            paragraphs = [{'text': p} for p in full_text.split('\n\n') if p.strip()]
+    return file, None
 
-        return jsonify(paragraphs)
 
+@app.route('/process', methods=['POST'])
+@limiter.limit("5 per minute")
+def process_file():
+    try:
+        file, error = get_uploaded_file()
+        if error:
+            return error
+
+        # Modo asíncrono: responder enseguida y procesar en la cola local. La subida
+        # se cierra al terminar la solicitud, así que el trabajo recibe una copia en disco.
+        if request.args.get('async') == '1':
+            with tempfile.NamedTemporaryFile(dir=UPLOAD_TMP_DIR, prefix='job-', delete=False) as copy:
+                file.stream.seek(0)
+                shutil.copyfileobj(file.stream, copy)
+            try:
+                job_id = ingest_jobs.submit(ingest_job, copy.name, file.filename)
+            except QueueFull:
+                os.unlink(copy.name)
+                return jsonify({"error": "El servidor está ocupado. Inténtalo en unos segundos."}), 503
+            return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+        payload, cache_hit = ingest_document(file.stream, file.filename)
+
+        response = compressed_json(payload)
+        response.headers['X-Upload-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return response
+
+    except IngestError as e:
+        return jsonify({"error": e.public_message}), 400
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         app.logger.error(f"Error al procesar archivo: {str(e)}")
         return jsonify({"error": "Error al procesar el archivo"}), 500
 
 
+def ingest_job(path, filename, on_progress):
+    """Trabajo en segundo plano de /process?async=1; borra la copia de la subida al terminar"""
+    try:
+        with open(path, 'rb') as file_stream:
+            payload, _ = ingest_document(file_stream, filename, on_progress)
+        return payload
+    finally:
+        os.unlink(path)
+
+
+@app.route('/process/jobs/<job_id>')
+@limiter.limit("60 per minute")
+def process_job_status(job_id):
+    """Progreso de un trabajo de ingesta: páginas hechas/total y resultado final"""
+    job = ingest_jobs.status(job_id) if JOB_ID_PATTERN.match(job_id) else None
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(job)
+
+
+@app.route('/documents/<document_id>/paragraphs')
+@limiter.limit("300 per minute")
+def document_paragraphs(document_id):
+    """Párrafos [offset, offset + limit) de un documento registrado"""
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', PARAGRAPH_PAGE_SIZE, type=int)
+    if offset < 0 or not 0 < limit <= PARAGRAPH_PAGE_MAX:
+        return jsonify({"error": f"offset debe ser >= 0 y limit estar entre 1 y {PARAGRAPH_PAGE_MAX}"}), 400
+
+    document = load_document(document_id)
+    response = compressed_json(paragraph_page(document_id, document['paragraphs'], offset, limit))
+    # El id es el hash del contenido: una página nunca cambia
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
+@app.route('/documents/<document_id>/cancel', methods=['POST'])
+@limiter.limit("60 per minute")
+def cancel_document_work(document_id):
+    """El usuario dejó el documento: descarta el trabajo especulativo pendiente
+    si ninguna otra subida del mismo documento lo está esperando"""
+    if not DOCUMENT_ID_PATTERN.match(document_id):
+        raise DocumentNotFound()
+    token = (request.get_json(silent=True) or {}).get('upload_token')
+    if not isinstance(token, str) or not UPLOAD_TOKEN_PATTERN.match(token):
+        return jsonify({"error": "upload_token no válido"}), 400
+    speculative_suggestions.cancel(document_id, token)
+    return '', 204
+
+
+COMPLEMENT_INSTRUCTIONS = (
+    "1) Datos adicionales relevantes (contexto teórico, cifras actualizadas, "
+    "ejemplos prácticos o controversias académicas).\n"
+
+    "EXACTAMENTE 2 referencias académicas confiables y especializadas en formato:\n"
+    "• NOMBRE_FUENTE (URL_OFICIAL)\n"
+    "(Prioriza fuentes institucionales, revistas científicas o bases de datos reconocidas "
+    "como PubMed, JSTOR, o repositorios " "universitarios. Evita blogs o sitios sin revisión por pares).\n"
+
+    "Asegúrate de que las referencias respalden directamente los datos agregados y "
+    "estén vinculadas al tema central del texto.\n"
+)
+
+
+def complement_cache_key(text, template='single'):
+    """Clave de caché por plantilla: 'single' (build_complement_prompt) o 'packed' (sección de un grupo)"""
+    return content_hash(GEMINI_MODEL, 'complement', template, COMPLEMENT_PROMPT_VERSION, text)
+
+
+def build_complement_prompt(text):
+    return (
+        "Como experto académico, analiza el texto proporcionado y complementa su información con:\n"
+        f"{COMPLEMENT_INSTRUCTIONS}"
+        "Texto para analizar:\n"
+        f"{text}"
+    )
+
+
+def parse_complement(response_text):
+    """Arma la respuesta de /complement con las fuentes ya validadas"""
+    content = response_text.replace('•', '•')
+    raw_sources = re.findall(
+        r'(?:•|\d+\.)\s*([^\(\n]+?)\s*\((\bhttps?:\/\/[^\s\)]+)\)',
+        content,
+        flags=re.IGNORECASE
+    )
+
+    # Filtrar fuentes válidas
+    valid_sources = []
+    for name, url in raw_sources[:2]:  # Limitar a 2 fuentes como antes
+        if validate_source(url):  # <- AQUÍ USAMOS LA VALIDACIÓN
+            clean_name = re.sub(r'[\*\#]', '', name).strip()
+            valid_sources.append({
+                "name": clean_name[:200],  # Limitar longitud del nombre
+                "url": url[:500]  # Limitar longitud de URL
+            })
+
+    # Si no hay fuentes válidas, usar fuente por defecto
+    if not valid_sources:
+        valid_sources = [{
+            "name": "Google Scholar",
+            "url": "https://scholar.google.com"
+        }]
+
+    return {
+        "complement": content,
+        "sources": valid_sources  # Fuentes validadas
+    }
+
+
 @app.route('/complement', methods=['POST'])
-@limiter.limit("5 per minute")
+@limiter.shared_limit(COMPLEMENT_RATE_LIMIT, scope='complement')
 def complement_info():
     try:
         data = request.get_json()
-        text = data.get('text', '').strip()
+        if data.get('document_id') and 'paragraph' in data:
+            # Párrafo de un documento registrado: no hace falta reenviar el texto
+            paragraphs = load_document(data['document_id'])['paragraphs']
+            index = data['paragraph']
+            if not isinstance(index, int) or not 0 <= index < len(paragraphs):
+                return jsonify({"error": "Párrafo no válido"}), 400
+            text = paragraphs[index].strip()
+        else:
+            text = data.get('text', '').strip()
 
         if not text:
             return jsonify({"error": "Texto vacío"}), 400
 
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
-            f"Como experto académico, analiza el texto proporcionado y complementa su información con:\n"
-
-            f"1) Datos adicionales relevantes (contexto teórico, cifras actualizadas, "
-            f"ejemplos prácticos o controversias académicas).\n"
-            
-            f"EXACTAMENTE 2 referencias académicas confiables y especializadas en formato:\n"
-            f"• NOMBRE_FUENTE (URL_OFICIAL)\n"
-            f"(Prioriza fuentes institucionales, revistas científicas o bases de datos reconocidas "
-            f"como PubMed, JSTOR, o repositorios " f"universitarios. Evita blogs o sitios sin revisión por pares).\n"
-            
-            f"Asegúrate de que las referencias respalden directamente los datos agregados y "
-            f"estén vinculadas al tema central del texto.\n"
-            f"Texto para analizar:\n"
-            f"{text}"
-        )
+        cache_key = complement_cache_key(text)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached_response(cached, hit=True)
 
-        if not response.text:
-            return jsonify({"error": "Respuesta inválida"}), 500
+        response_text = generate_text(build_complement_prompt(text))
 
-        content = response.text.replace('•', '•')
-        raw_sources = re.findall(
-            r'(?:•|\d+\.)\s*([^\(\n]+?)\s*\((\bhttps?:\/\/[^\s\)]+)\)',
-            content,
-            flags=re.IGNORECASE
-        )
+        if not response_text:
+            return jsonify({"error": "Respuesta inválida"}), 500
 
-        # Filtrar fuentes válidas
-        valid_sources = []
-        for name, url in raw_sources[:2]:  # Limitar a 2 fuentes como antes
-            if validate_source(url):  # <- AQUÍ USAMOS LA VALIDACIÓN
-                clean_name = re.sub(r'[\*\#]', '', name).strip()
-                valid_sources.append({
-                    "name": clean_name[:200],  # Limitar longitud del nombre
-                    "url": url[:500]  # Limitar longitud de URL
-                })
-
-        # Si no hay fuentes válidas, usar fuente por defecto
-        if not valid_sources:
-            valid_sources = [{
-                "name": "Google Scholar",
-                "url": "https://scholar.google.com"
-            }]
+        payload = parse_complement(response_text)
+        response_cache.set(cache_key, payload)
 
-        return jsonify({
-            "complement": content,
-            "sources": valid_sources  # Fuentes validadas
-        })
+        return cached_response(payload, hit=False)
 
+    except (DocumentNotFound, UpstreamBusy):
+        raise
     except Exception as e:
         app.logger.error(f"Error: {str(e)}")
         return jsonify({"error": "Error en el servidor"}), 500
 
+
+def batch_complement_items(data):
+    """Lista de (id, texto) del lote; los ids son índices de párrafo o posiciones en `texts`"""
+    if 'batch_items' not in g:
+        if data.get('document_id') and isinstance(data.get('paragraphs'), list):
+            paragraphs = load_document(data['document_id'])['paragraphs']
+            items = [(i, paragraphs[i].strip()) for i in data['paragraphs']
+                     if isinstance(i, int) and 0 <= i < len(paragraphs)]
+        elif isinstance(data.get('texts'), list):
+            items = [(i, t.strip()) for i, t in enumerate(data['texts']) if isinstance(t, str)]
+        else:
+            items = []
+        g.batch_items = [(i, t) for i, t in items if t][:COMPLEMENT_BATCH_MAX_ITEMS]
+    return g.batch_items
+
+
+def complement_batch_cost():
+    """Costo del lote para el rate limit: una unidad por cada prompt empaquetado, igual
+    que una llamada a /complement, con el que comparte el presupuesto"""
+    try:
+        items = batch_complement_items(request.get_json(silent=True) or {})
+    except DocumentNotFound:
+        return 1
+    prompts = len(pack_complement_items(items))
+    # Un lote que nunca cabría en el presupuesto se rechaza en la vista con un mensaje claro
+    return prompts if 0 < prompts <= COMPLEMENT_MAX_PROMPTS else 1
+
+
+def pack_complement_items(items):
+    """Agrupa párrafos cortos en un mismo prompt; los largos van solos"""
+    groups, current, current_chars = [], [], 0
+    for item in items:
+        size = len(item[1])
+        if size >= COMPLEMENT_PACK_THRESHOLD:
+            groups.append([item])
+            continue
+        if current and (current_chars + size > COMPLEMENT_PACK_MAX_CHARS or
+                        len(current) >= COMPLEMENT_PACK_MAX_ITEMS):
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(item)
+        current_chars += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def complement_group(group):
+    """Complementa un grupo de párrafos con un solo prompt y devuelve [(id, plantilla, payload)].
+
+    `payload` es None si el modelo no devolvió la sección del párrafo: repetirla
+    sería una llamada más que el costo del lote no incluye.
+    """
+    if len(group) == 1:
+        item_id, text = group[0]
+        return [(item_id, 'single', parse_complement(generate_text(build_complement_prompt(text))))]
+
+    fragments = '\n\n'.join(f"### FRAGMENTO {n}\n{text}" for n, (_, text) in enumerate(group, 1))
+    response_text = generate_text(
+        "Como experto académico, analiza por separado cada fragmento proporcionado y "
+        "complementa su información con:\n"
+        f"{COMPLEMENT_INSTRUCTIONS}"
+        "Responde cada fragmento en su propia sección que empiece con la línea "
+        "\"### FRAGMENTO n\" (el mismo número del fragmento) y no escribas nada fuera de ellas.\n"
+        f"Fragmentos para analizar:\n{fragments}"
+    )
+
+    sections = {}
+    for match in re.finditer(r'^#+\s*FRAGMENTO\s+(\d+)\s*$(.*?)(?=^#+\s*FRAGMENTO\s+\d+\s*$|\Z)',
+                             response_text, flags=re.MULTILINE | re.DOTALL | re.IGNORECASE):
+        sections[int(match.group(1))] = match.group(2).strip()
+
+    return [(item_id, 'packed', parse_complement(sections[n]) if sections.get(n) else None)
+            for n, (item_id, _) in enumerate(group, 1)]
+
+
+@app.route('/complement/batch', methods=['POST'])
+@limiter.shared_limit(COMPLEMENT_RATE_LIMIT, scope='complement', cost=complement_batch_cost)
+def complement_batch():
+    """Complementa varios párrafos y envía cada resultado por SSE en cuanto está listo.
+
+    Acepta {document_id, paragraphs: [índices]} o {texts: [...]}. Eventos:
+    `paragraph` con {id, complement, sources, cached}, `error` con {id, error}
+    y `done` al terminar.
+    """
+    items = batch_complement_items(request.get_json())
+    if not items:
+        return jsonify({"error": "No hay párrafos para complementar"}), 400
+    if len(pack_complement_items(items)) > COMPLEMENT_MAX_PROMPTS:
+        return jsonify({
+            "error": f"El lote requiere más de {COMPLEMENT_MAX_PROMPTS} consultas; divídelo en lotes menores"
+        }), 400
+
+    def generate():
+        pending = []
+        for item_id, text in items:
+            # En lote sirve cualquiera de las dos plantillas; /complement solo usa la individual
+            cached = (response_cache.get(complement_cache_key(text)) or
+                      response_cache.get(complement_cache_key(text, 'packed')))
+            if cached is not None:
+                yield sse_event('paragraph', dict(cached, id=item_id, cached=True))
+            else:
+                pending.append((item_id, text))
+
+        texts = dict(pending)
+        executor = ThreadPoolExecutor(max_workers=COMPLEMENT_BATCH_CONCURRENCY)
+        try:
+            futures = {executor.submit(complement_group, group): group
+                       for group in pack_complement_items(pending)}
+            for future in as_completed(futures):
+                try:
+                    for item_id, template, payload in future.result():
+                        if payload is None:
+                            yield sse_event('error', {"id": item_id, "error": "Sin respuesta para este párrafo"})
+                            continue
+                        response_cache.set(complement_cache_key(texts[item_id], template), payload)
+                        yield sse_event('paragraph', dict(payload, id=item_id, cached=False))
+                except Exception as e:
+                    app.logger.error(f"Error en lote de complementos: {str(e)}")
+                    for item_id, _ in futures[future]:
+                        yield sse_event('error', {"id": item_id, "error": "Error en el servidor"})
+        finally:
+            # Si el cliente se desconecta llega GeneratorExit: los grupos en cola ya no se envían a Gemini
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        yield sse_event('done', {})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 if __name__ == "__main__":
     # Configuración para desarrollo vs producción
     if os.environ.get('FLASK_ENV') == 'production':
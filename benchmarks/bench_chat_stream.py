@@ -0,0 +1,100 @@
+"""Mide el tiempo hasta el primer token (TTFT) de /chat/stream frente a /chat.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_chat_stream --requests 20 --answer-words 300
+
+Arranca el Gemini falso de benchmarks/fake_gemini.py con una respuesta de
+`--answer-words` palabras, levanta la aplicación con gunicorn.conf.py y hace
+`--requests` preguntas secuenciales a cada endpoint. En /chat el primer
+texto llega con la respuesta completa; en /chat/stream, con el primer
+evento `token`. Con latencia L y ritmo de salida R, /chat tarda unos
+L + palabras/R y /chat/stream empieza a mostrar texto tras L + un fragmento.
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_gemini import serve  # noqa: E402
+from benchmarks.load_test import free_port, start_app, upload  # noqa: E402
+from benchmarks.synthetic import document_pages, make_pdf  # noqa: E402
+
+QUESTION = '¿Cuál es el tema principal?'
+
+
+def ask(base_url, path, document_id, number):
+    """Devuelve (segundos hasta el primer texto, segundos hasta el final, caracteres)"""
+    # Una pregunta distinta cada vez para que ninguna caché acorte la llamada a Gemini
+    body = json.dumps({'document_id': document_id, 'question': f"{QUESTION} ({number})"}).encode()
+    request = urllib.request.Request(base_url + path, data=body, headers={
+        'Content-Type': 'application/json', 'User-Agent': 'bench'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        if path == '/chat':
+            answer = json.load(response)['answer']
+            elapsed = time.perf_counter() - start
+            return elapsed, elapsed, len(answer)
+
+        first = None
+        event = None
+        answer = ''
+        for line in response:
+            line = line.decode('utf-8').rstrip('\n')
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                if event == 'token' and first is None:
+                    first = time.perf_counter() - start
+                elif event == 'done':
+                    answer = json.loads(line[len('data: '):])['answer']
+                elif event == 'error':
+                    raise RuntimeError(line)
+        return first, time.perf_counter() - start, len(answer)
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(0.95 * (len(samples) - 1))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.5, help='latencia fija del Gemini falso (s)')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='tokens de salida por segundo')
+    parser.add_argument('--answer-words', type=int, default=300)
+    parser.add_argument('--worker-class', default='gthread')
+    args = parser.parse_args()
+
+    answer = "Según el documento: " + ' '.join(f"palabra{i}" for i in range(args.answer_words))
+    gemini = serve(latency=args.latency, token_rate=args.token_rate, answer=answer, caching=False)
+    process, base_url = start_app(args.worker_class, 1, gemini.url, free_port())
+    try:
+        document_id = upload(base_url, make_pdf(document_pages(5)))
+        print(f"{args.requests} preguntas por endpoint, latencia de Gemini {args.latency}s, "
+              f"{args.token_rate:.0f} tokens/s, respuesta de {len(answer)} caracteres")
+        print(f"{'endpoint':<14} {'TTFT p50':>10} {'TTFT p95':>10} {'total p50':>10} {'total p95':>10}")
+        for path in ('/chat', '/chat/stream'):
+            results = [ask(base_url, path, document_id, i) for i in range(args.requests)]
+            if any(length != len(answer) for _, _, length in results):
+                print(f"{path:<14} respuesta incompleta")
+                continue
+            ttft = summary([first for first, _, _ in results])
+            total = summary([elapsed for _, elapsed, _ in results])
+            print(f"{path:<14} {ttft[0]:>8.0f}ms {ttft[1]:>8.0f}ms {total[0]:>8.0f}ms {total[1]:>8.0f}ms")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+        gemini.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Mide el ahorro de caracteres y tokens de la compactación de texto de PDF.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_compaction --pages 200
+
+Genera un PDF sintético con encabezado repetido, número de página y palabras
+cortadas con guion, extrae su texto con PdfExtractor y compara la unión
+directa de las páginas con compaction.compact_pages: caracteres, tokens
+estimados, tiempo de la etapa y cuántas páginas caben en MAX_PROMPT_CHARS.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import document_pages, make_pdf  # noqa: E402
+from compaction import CHARS_PER_TOKEN, compact_pages  # noqa: E402
+from pdf_extract import PdfExtractor  # noqa: E402
+
+MAX_PROMPT_CHARS = 50000  # el mismo corte que aplica app.py
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--header', default='Revista Iberoamericana de Biología Molecular — Vol. 12, núm. 3')
+    args = parser.parse_args()
+
+    pdf = make_pdf(document_pages(args.pages), header=args.header, hyphenate=True)
+    pages = [text for text in PdfExtractor(workers=0, page_timeout=10).extract(pdf) if text.strip()]
+
+    raw = ' '.join(pages)
+    start = time.perf_counter()
+    compacted, savings = compact_pages(pages)
+    elapsed = time.perf_counter() - start
+
+    def pages_in_prompt(text):
+        return args.pages * min(1.0, MAX_PROMPT_CHARS / len(text))
+
+    print(f"PDF: {args.pages} páginas, {len(pdf) / 1024:,.0f} KiB")
+    print(f"sin compactar {len(raw):>10,} chars  ~{len(raw) // CHARS_PER_TOKEN:>8,} tokens  "
+          f"{pages_in_prompt(raw):6.1f} páginas caben en el prompt")
+    print(f"compactado    {len(compacted):>10,} chars  ~{len(compacted) // CHARS_PER_TOKEN:>8,} tokens  "
+          f"{pages_in_prompt(compacted):6.1f} páginas caben en el prompt")
+    print(f"ahorro {1 - len(compacted) / len(raw):.1%}: {savings['boilerplate_lines']} líneas repetidas, "
+          f"{savings['hyphenations']} guiones; compactación en {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compara los tokens enviados a Gemini en una sesión de chat con y sin caché de contexto.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_context_cache --pages 60 --questions 10
+
+Arranca el Gemini falso de benchmarks/fake_gemini.py (que registra los
+tokens de cada llamada) y hace las mismas preguntas sobre un PDF sintético
+de tres formas: documento completo en cada turno (`document_text`),
+fragmentos top-k (`document_id`, el modo por defecto) y caché de contexto
+(`document_id` con CONTEXT_CACHE_ENABLED=1, el documento se registra una vez
+y cada turno envía solo la pregunta).
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini import serve  # noqa: E402
+from benchmarks.synthetic import WORDS, document_pages, make_pdf  # noqa: E402
+
+
+def run_session(client, gemini, questions, body):
+    with gemini.lock:
+        first_call = len(gemini.calls)
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        response = client.post('/chat', json=dict(body, question=question), headers={'User-Agent': 'bench'})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+    with gemini.lock:
+        calls = gemini.calls[first_call:]
+    return calls, latencies
+
+
+def summary(name, calls, latencies):
+    sent = sum(call['prompt_tokens'] for call in calls)
+    cached = sum(call.get('cached_tokens', 0) for call in calls)
+    print(f"{name:<18} tokens enviados {sent:>9,}   leídos de caché {cached:>9,}   "
+          f"llamadas {len(calls):>3}   latencia p50 {statistics.median(latencies) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=60)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.1, help='latencia fija del Gemini falso (s)')
+    parser.add_argument('--prefill-rate', type=float, default=20000.0, help='tokens de entrada por segundo')
+    args = parser.parse_args()
+
+    gemini = serve(latency=args.latency, prefill_rate=args.prefill_rate, token_rate=2000)
+    os.environ.update(
+        GEMINI_API_KEY='fake',
+        GEMINI_TRANSPORT='rest',
+        GEMINI_API_ENDPOINT=gemini.url,
+        CACHE_DIR=tempfile.mkdtemp(prefix='bench-context-cache-'),
+        CONTEXT_CACHE_MIN_CHARS='0',  # el servidor falso acepta contextos de cualquier tamaño
+        PDF_EXTRACT_WORKERS='0',
+    )
+    import app as lector
+
+    lector.limiter.enabled = False
+    client = lector.app.test_client()
+
+    response = client.post('/process', data={'file': (io.BytesIO(make_pdf(document_pages(args.pages))), 'bench.pdf')},
+                           headers={'User-Agent': 'bench'})
+    payload = response.get_json()
+    document_text = lector.load_document(payload['document_id'])['text']
+    print(f"PDF: {args.pages} páginas, {len(document_text):,} chars; {args.questions} preguntas por sesión")
+
+    questions = [f"¿Qué relación hay entre {WORDS[i % len(WORDS)]} y {WORDS[(i * 7 + 3) % len(WORDS)]}?"
+                 for i in range(args.questions)]
+
+    summary('documento completo', *run_session(client, gemini, questions, {'document_text': document_text}))
+    summary('top-k', *run_session(client, gemini, questions, {'document_id': payload['document_id']}))
+    lector.CONTEXT_CACHE_ENABLED = True
+    summary('caché de contexto', *run_session(client, gemini, questions, {'document_id': payload['document_id']}))
+    gemini.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Mide la extracción de texto de PDFs grandes en serie y con el pool de procesos.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_pdf_extract --pages 100 300 600 --workers 0 2 4
+
+`--workers 0` corresponde a la extracción en serie del hilo de la solicitud.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import document_pages, make_pdf  # noqa: E402
+from pdf_extract import PdfExtractor  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 300, 600])
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, os.cpu_count() or 1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'páginas':>8} {'KiB':>8} {'workers':>8} {'mejor (s)':>10} {'págs/s':>8}")
+    for pages in args.pages:
+        pdf = make_pdf(document_pages(pages))
+        baseline = None
+        for workers in args.workers:
+            extractor = PdfExtractor(workers=workers, page_timeout=10, min_parallel_pages=1)
+            extractor.extract(pdf)  # Calentamiento: arranque del pool
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                texts = extractor.extract(pdf)
+                best = min(best, time.perf_counter() - start)
+            assert len(texts) == pages
+            baseline = baseline or best
+            print(f"{pages:>8} {len(pdf) / 1024:>8.0f} {workers:>8} {best:>10.3f} "
+                  f"{pages / best:>8.0f}   x{baseline / best:.2f}")
+            extractor._reset_pool()
+
+
+if __name__ == '__main__':
+    main()
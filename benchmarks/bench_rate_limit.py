@@ -0,0 +1,148 @@
+"""Mide el costo por comprobación de rate limit y la consistencia entre procesos.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_rate_limit --checks 20000 --processes 4
+    python -m benchmarks.bench_rate_limit --gevent
+
+Compara `memory://` (contadores por proceso) con el almacenamiento SQLite de
+rate_limit_storage.py. Primero mide la latencia de `hit()` en un solo
+proceso; después, la de `--requests` solicitudes concurrentes con un hit
+cada una (un hilo por solicitud, o un greenlet con `--gevent`, como en los
+workers de gunicorn) y cuántas conexiones SQLite se abrieron. Por último
+lanza varios procesos contra la misma clave con un límite fijo y cuenta
+cuántas solicitudes se aceptaron en total: con almacenamiento compartido
+debe coincidir con el límite, con memoria se multiplica por el número de
+procesos.
+"""
+import sys
+
+if '--gevent' in sys.argv:
+    # Antes de cualquier otro import, como hace el worker gevent de gunicorn
+    from gevent import monkey
+    monkey.patch_all()
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import STRATEGIES  # noqa: E402
+
+import rate_limit_storage  # noqa: E402,F401
+
+
+def measure(uri, strategy, checks, keys):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse("1000000 per minute")
+    samples = []
+    for i in range(checks):
+        start = time.perf_counter()
+        limiter.hit(item, f"clave-{i % keys}")
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))], sum(samples)
+
+
+def concurrent_requests(uri, strategy, requests):
+    """Un hit por solicitud, cada una en su hilo; devuelve (p50, p99, conexiones abiertas)"""
+    item = parse("1000000 per minute")
+    connect = sqlite3.connect
+    opened = []
+
+    def counting_connect(*args, **kwargs):
+        opened.append(1)
+        return connect(*args, **kwargs)
+
+    samples = []
+
+    def request(i):
+        start = time.perf_counter()
+        limiter.hit(item, f"clave-{i}")
+        samples.append(time.perf_counter() - start)
+
+    sqlite3.connect = counting_connect
+    try:
+        limiter = STRATEGIES[strategy](storage_from_string(uri))
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sqlite3.connect = connect
+    samples.sort()
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))], len(opened)
+
+
+def hammer(uri, strategy, limit, attempts, accepted):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse(f"{limit} per minute")
+    count = sum(1 for _ in range(attempts) if limiter.hit(item, "compartida"))
+    with accepted.get_lock():
+        accepted.value += count
+
+
+def contention(uri, strategy, processes, limit, attempts):
+    accepted = multiprocessing.Value('i', 0)
+    workers = [multiprocessing.Process(target=hammer, args=(uri, strategy, limit, attempts, accepted))
+               for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return accepted.value, processes * attempts / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=500, help='clientes distintos simulados')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--attempts', type=int, default=2000, help='intentos por proceso')
+    parser.add_argument('--requests', type=int, default=100, help='solicitudes concurrentes')
+    parser.add_argument('--gevent', action='store_true', help='parchear con gevent (un greenlet por solicitud)')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bench-rate-limit-')
+    backends = [
+        ('memory://', 'fixed-window'),
+        ('memory://', 'sliding-window-counter'),
+        (f"sqlite://{os.path.join(directory, 'latencia.sqlite3')}", 'sliding-window-counter'),
+    ]
+
+    print(f"Costo por hit(), {args.checks} comprobaciones sobre {args.keys} claves")
+    for uri, strategy in backends:
+        p50, p99, total = measure(uri, strategy, args.checks, args.keys)
+        print(f"  {uri.split(':')[0]:<7} {strategy:<23} p50 {p50 * 1e6:7.1f} µs   "
+              f"p99 {p99 * 1e6:7.1f} µs   {args.checks / total:>9,.0f} hits/s")
+
+    print(f"\n{args.requests} solicitudes concurrentes, un hit cada una "
+          f"({'greenlets' if args.gevent else 'hilos'})")
+    uri = f"sqlite://{os.path.join(directory, 'solicitudes.sqlite3')}"
+    p50, p99, opened = concurrent_requests(uri, 'sliding-window-counter', args.requests)
+    print(f"  sqlite  sliding-window-counter  p50 {p50 * 1e6:7.1f} µs   p99 {p99 * 1e6:7.1f} µs   "
+          f"{opened} conexiones abiertas")
+
+    print(f"\n{args.processes} procesos x {args.attempts} intentos contra un límite de {args.limit}/min")
+    for uri, strategy in [('memory://', 'sliding-window-counter'),
+                          (f"sqlite://{os.path.join(directory, 'contencion.sqlite3')}",
+                           'sliding-window-counter')]:
+        accepted, rate = contention(uri, strategy, args.processes, args.limit, args.attempts)
+        print(f"  {uri.split(':')[0]:<7} aceptadas {accepted:>5} (esperado {args.limit})   "
+              f"{rate:>9,.0f} hits/s en total")
+
+
+if __name__ == '__main__':
+    main()
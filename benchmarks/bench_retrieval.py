@@ -0,0 +1,81 @@
+"""Compara el prompt de /chat con documento completo frente a la recuperación top-k.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_retrieval --pages 300 --questions 20
+
+Sube un PDF sintético a /process con el cliente de pruebas de Flask y hace
+las mismas preguntas por las dos vías: `document_text` (documento completo,
+cortado en MAX_PROMPT_CHARS) y `document_id` (fragmentos top-k). Gemini se
+sustituye por un modelo local cuya latencia crece con el tamaño del prompt.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='bench-retrieval-'))
+
+from benchmarks.fake_gemini import FakeGenerativeModel  # noqa: E402
+from benchmarks.synthetic import WORDS, document_pages, make_pdf  # noqa: E402
+
+import app as lector  # noqa: E402
+
+
+def run_mode(client, questions, body):
+    prompt_sizes, latencies = [], []
+    for question in questions:
+        FakeGenerativeModel.prompts.clear()
+        start = time.perf_counter()
+        response = client.post('/chat', json=dict(body, question=question),
+                               headers={'User-Agent': 'bench'})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+        prompt_sizes.append(len(FakeGenerativeModel.prompts[-1]))
+    return prompt_sizes, latencies
+
+
+def summary(name, prompt_sizes, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{name:<12} prompt medio {statistics.mean(prompt_sizes):>10,.0f} chars   "
+          f"latencia p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+          f"p95 {p95 * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--prefill-rate', type=float, default=FakeGenerativeModel.prefill_rate,
+                        help='tokens de entrada por segundo del modelo simulado')
+    args = parser.parse_args()
+
+    FakeGenerativeModel.prefill_rate = args.prefill_rate
+    lector.model = FakeGenerativeModel()
+    lector.limiter.enabled = False
+    client = lector.app.test_client()
+
+    pdf = make_pdf(document_pages(args.pages))
+    start = time.perf_counter()
+    response = client.post('/process', data={'file': (io.BytesIO(pdf), 'bench.pdf')},
+                           headers={'User-Agent': 'bench'})
+    ingest = time.perf_counter() - start
+    payload = response.get_json()
+    document_text = lector.load_document(payload['document_id'])['text']
+    print(f"PDF: {args.pages} páginas, {len(pdf) / 1024:,.0f} KiB, "
+          f"{len(document_text):,} chars de texto; ingesta con índice {ingest * 1000:.0f} ms")
+
+    questions = [f"¿Qué relación hay entre {WORDS[i % len(WORDS)]} y "
+                 f"{WORDS[(i * 7 + 3) % len(WORDS)]}?" for i in range(args.questions)]
+
+    summary('completo', *run_mode(client, questions, {'document_text': document_text}))
+    summary('top-k', *run_mode(client, questions, {'document_id': payload['document_id']}))
+
+
+if __name__ == '__main__':
+    main()
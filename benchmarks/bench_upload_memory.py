@@ -0,0 +1,105 @@
+"""Mide el pico de memoria (RSS) de /process según el tamaño del archivo subido.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_upload_memory --sizes 10 50 100 200
+
+Para cada tamaño escribe en disco un PDF tipo libro escaneado (una imagen de
+`--page-mb` MB por página, así que las páginas crecen con el tamaño) y un
+DOCX con el mismo peso en imágenes, y lo sube en un proceso nuevo con el
+cliente de pruebas de Flask leyendo el archivo desde disco. Informa del RSS
+tras importar la app y del pico durante la solicitud: con las subidas
+volcadas a disco y los parsers leyendo del archivo, el pico no debería
+crecer con el tamaño.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import document_pages, write_docx_with_media, write_scanned_pdf  # noqa: E402
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB en Linux
+
+
+def child(path):
+    """Sube `path` a /process en este proceso e imprime las medidas en JSON"""
+    os.environ.update(
+        GEMINI_API_KEY='fake',
+        CACHE_DIR=tempfile.mkdtemp(prefix='bench-upload-memory-'),
+        PDF_EXTRACT_WORKERS='0',  # en serie: toda la memoria cuenta en este proceso
+        SPECULATIVE_SUGGESTIONS='0',
+        RATELIMIT_ENABLED='0',
+        MAX_UPLOAD_MB='1024',
+    )
+    import app as lector
+
+    client = lector.app.test_client()
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        response = client.post('/process', data={'file': (f, os.path.basename(path))},
+                               headers={'User-Agent': 'bench'})
+    elapsed = time.perf_counter() - start
+    payload = response.get_json()
+    print(json.dumps({
+        "status": response.status_code,
+        "paragraphs": payload.get('total_paragraphs'),
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "seconds": elapsed
+    }))
+
+
+def measure(path):
+    result = subprocess.run([sys.executable, '-m', 'benchmarks.bench_upload_memory', '--child', path],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 100, 200], help='tamaños en MB')
+    parser.add_argument('--page-mb', type=float, default=1.0, help='MB de imagen por página del PDF')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench-upload-files-')
+    print(f"{'archivo':<10} {'MB':>6} {'párrafos':>9} {'RSS base':>9} {'RSS pico':>9} {'pico - base':>12} {'tiempo':>8}")
+    for size in args.sizes:
+        pages = max(1, int(size / args.page_mb))
+        files = {
+            'pdf': lambda path: write_scanned_pdf(path, document_pages(pages, seed=size),
+                                                  int(args.page_mb * 1024 * 1024)),
+            'docx': lambda path: write_docx_with_media(path, document_pages(pages, seed=size),
+                                                       size * 1024 * 1024),
+        }
+        for kind, write in files.items():
+            path = os.path.join(workdir, f"scan-{size}mb.{kind}")
+            write(path)
+            file_mb = os.path.getsize(path) / 2 ** 20
+            result = measure(path)
+            os.unlink(path)
+            if result['status'] != 200:
+                print(f"{kind:<10} {file_mb:>6.0f} error {result['status']}")
+                continue
+            print(f"{kind:<10} {file_mb:>6.0f} "
+                  f"{result['paragraphs']:>9} {result['baseline_mb']:>7.0f}MB {result['peak_mb']:>7.0f}MB "
+                  f"{result['peak_mb'] - result['baseline_mb']:>10.0f}MB {result['seconds']:>7.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Sustitutos locales de Gemini para los benchmarks.
+
+- `FakeGenerativeModel`: reemplazo en proceso de `genai.GenerativeModel`.
+- `serve()` / `python -m benchmarks.fake_gemini`: servidor HTTP que imita la
+  API REST de generateContent, streamGenerateContent y cachedContents. La
+  aplicación lo usa con GEMINI_TRANSPORT=rest y
+  GEMINI_API_ENDPOINT=http://127.0.0.1:<puerto>.
+
+La latencia simulada es `latency + tokens_de_entrada / prefill_rate +
+tokens_de_salida / token_rate`, estimando 4 caracteres por token. Los tokens
+de un contexto cacheado no cuentan como entrada: se registran aparte en
+`cached_tokens`. Con `caching=False` la creación de contextos responde 400,
+como un modelo que no admite caché.
+"""
+import argparse
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+CHARS_PER_TOKEN = 4
+DEFAULT_ANSWER = "Según el documento: " + "respuesta simulada " * 20
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Reemplazo en proceso de genai.GenerativeModel que registra cada prompt"""
+
+    latency = 0.05
+    prefill_rate = 20000.0  # tokens de entrada por segundo
+    token_rate = 200.0  # tokens de salida por segundo
+    answer = DEFAULT_ANSWER
+    prompts = []
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **kwargs):
+        type(self).prompts.append(prompt)
+        time.sleep(self.latency +
+                   estimate_tokens(prompt) / self.prefill_rate +
+                   estimate_tokens(self.answer) / self.token_rate)
+        return FakeResponse(self.answer)
+
+
+def _candidate(text, finished):
+    payload = {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "index": 0
+        }]
+    }
+    if finished:
+        payload["candidates"][0]["finishReason"] = "STOP"
+    return payload
+
+
+def _prompt_text(body):
+    texts = []
+    contents = list(body.get('contents', []))
+    if body.get('systemInstruction'):
+        contents.append(body['systemInstruction'])
+    for content in contents:
+        for part in content.get('parts', []):
+            texts.append(part.get('text', ''))
+    return '\n'.join(texts)
+
+
+def _error(code, status, message):
+    return {"error": {"code": code, "message": message, "status": status}}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/_stats':
+            with self.server.lock:
+                calls = [dict(call) for call in self.server.calls]
+            self._send_json(200, {"calls": calls})
+        elif '/cachedContents/' in path:
+            context = self._context(path[path.index('cachedContents/'):])
+            if context is None:
+                self._send_json(404, _error(404, "NOT_FOUND", "CachedContent not found"))
+            else:
+                self._send_json(200, context['resource'])
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def _context(self, name):
+        with self.server.lock:
+            context = self.server.contexts.get(name)
+            if context is not None and context['expires'] <= time.time():
+                del self.server.contexts[name]
+                context = None
+        return context
+
+    def _create_context(self, body):
+        server = self.server
+        if not server.caching:
+            self._send_json(400, _error(400, "INVALID_ARGUMENT", "Model does not support caching"))
+            return
+        tokens = estimate_tokens(_prompt_text(body))
+        ttl = float(str(body.get('ttl', '3600s')).rstrip('s'))
+        name = f"cachedContents/{secrets.token_hex(8)}"
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        resource = {
+            "name": name,
+            "model": body.get('model', ''),
+            "displayName": body.get('displayName', ''),
+            "createTime": now,
+            "updateTime": now,
+            "expireTime": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + ttl)),
+            "usageMetadata": {"totalTokenCount": tokens}
+        }
+        with server.lock:
+            server.contexts[name] = {"resource": resource, "tokens": tokens, "expires": time.time() + ttl}
+            server.calls.append({"path": "/cachedContents", "prompt_tokens": tokens, "output_tokens": 0})
+        time.sleep(server.latency + tokens / server.prefill_rate)
+        self._send_json(200, resource)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+
+        if path.endswith('/cachedContents'):
+            self._create_context(body)
+        elif path.endswith(':generateContent') or path.endswith(':streamGenerateContent'):
+            start = time.perf_counter()
+            prompt = _prompt_text(body)
+            call = {
+                "path": path,
+                "prompt_tokens": estimate_tokens(prompt),
+                "output_tokens": estimate_tokens(server.answer)
+            }
+            if body.get('cachedContent'):
+                context = self._context(body['cachedContent'])
+                if context is None:
+                    self._send_json(404, _error(404, "NOT_FOUND", "CachedContent not found"))
+                    return
+                call["cached_tokens"] = context['tokens']
+            with server.lock:
+                server.calls.append(call)
+            time.sleep(server.latency + estimate_tokens(prompt) / server.prefill_rate)
+            if path.endswith(':streamGenerateContent'):
+                self._stream(server.answer)
+            else:
+                time.sleep(estimate_tokens(server.answer) / server.token_rate)
+                self._send_json(200, _candidate(server.answer, finished=True))
+            with server.lock:
+                call["duration"] = time.perf_counter() - start
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def _stream(self, answer):
+        # La API REST en streaming devuelve un arreglo JSON que se va escribiendo
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        words = answer.split(' ')
+        step = 8
+        self.wfile.write(b'[')
+        for i in range(0, len(words), step):
+            text = ' '.join(words[i:i + step]) + ('' if i + step >= len(words) else ' ')
+            time.sleep(estimate_tokens(text) / self.server.token_rate)
+            if i:
+                self.wfile.write(b',\n')
+            self.wfile.write(json.dumps(_candidate(text, finished=i + step >= len(words))).encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b']')
+
+
+def serve(host='127.0.0.1', port=0, latency=0.5, prefill_rate=20000.0, token_rate=200.0,
+          answer=DEFAULT_ANSWER, caching=True):
+    """Arranca el servidor falso en un hilo y lo devuelve (su URL queda en `.url`)"""
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.prefill_rate = prefill_rate
+    server.token_rate = token_rate
+    server.answer = answer
+    server.caching = caching
+    server.contexts = {}
+    server.calls = []
+    server.lock = threading.Lock()
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de Gemini")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help='segundos fijos por llamada')
+    parser.add_argument('--prefill-rate', type=float, default=20000.0, help='tokens de entrada por segundo')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='tokens de salida por segundo')
+    parser.add_argument('--no-caching', action='store_true', help='rechazar la creación de contextos cacheados')
+    args = parser.parse_args()
+
+    server = serve(port=args.port, latency=args.latency, prefill_rate=args.prefill_rate,
+                   token_rate=args.token_rate, caching=not args.no_caching)
+    print(f"Gemini falso escuchando en {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Prueba de carga de /chat con distintos tipos de worker de gunicorn.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.load_test --worker-class sync gthread gevent --concurrency 50
+
+Arranca el Gemini falso de benchmarks/fake_gemini.py, levanta la aplicación
+con gunicorn.conf.py para cada tipo de worker y lanza `--requests` llamadas
+a /chat con `--concurrency` clientes simultáneos. Con latencia de Gemini L
+y W procesos, los workers sync no superan W/L solicitudes por segundo.
+
+Con `--uploads N` se suben además N documentos DOCX grandes (distintos, sin
+caché) durante la carga de chat, y un sondeo de /stats cada 50 ms mide cuánto
+se detiene el worker mientras se ingiere: con gevent, el parseo y la
+sanitización no deben bloquear las demás solicitudes.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_gemini import serve  # noqa: E402
+from benchmarks.synthetic import document_pages, make_docx, make_pdf  # noqa: E402
+
+CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(worker_class, workers, gemini_url, port, **extra_env):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=str(workers),
+        GEMINI_API_KEY='fake',
+        GEMINI_TRANSPORT='rest',
+        GEMINI_API_ENDPOINT=gemini_url,
+        RATELIMIT_ENABLED='0',
+        CACHE_DIR=tempfile.mkdtemp(prefix='load-test-'),
+        **extra_env
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(150):
+        try:
+            urllib.request.urlopen(urllib.request.Request(base_url + '/', headers={'User-Agent': 'load'}), timeout=1)
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"La aplicación no arrancó con workers {worker_class}")
+
+
+def upload(base_url, data, filename='load.pdf'):
+    boundary = uuid.uuid4().hex
+    content_type = CONTENT_TYPES[os.path.splitext(filename)[1]]
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(base_url + '/process', data=body, headers={
+        'Content-Type': f'multipart/form-data; boundary={boundary}', 'User-Agent': 'load'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.load(response)['document_id']
+
+
+def chat(base_url, document_id):
+    body = json.dumps({'document_id': document_id, 'question': '¿Cuál es el tema principal?'}).encode()
+    request = urllib.request.Request(base_url + '/chat', data=body, headers={
+        'Content-Type': 'application/json', 'User-Agent': 'load'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            ok = response.status == 200
+    except OSError:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def probe(base_url, stop, gaps):
+    """Consulta /stats cada 50 ms y guarda la latencia de cada respuesta"""
+    request = urllib.request.Request(base_url + '/stats', headers={'User-Agent': 'load'})
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            urllib.request.urlopen(request, timeout=120).read()
+            gaps.append(time.perf_counter() - start)
+        except OSError:
+            gaps.append(float('inf'))
+        time.sleep(0.05)
+
+
+def ingest(base_url, documents):
+    start = time.perf_counter()
+    for number, data in enumerate(documents):
+        upload(base_url, data, f"ingesta-{number}.docx")
+    return time.perf_counter() - start
+
+
+def run(worker_class, args, gemini_url, document, uploads):
+    process, base_url = start_app(worker_class, args.workers, gemini_url, free_port())
+    stop, gaps = threading.Event(), []
+    try:
+        document_id = upload(base_url, document)
+        prober = threading.Thread(target=probe, args=(base_url, stop, gaps), daemon=True)
+        prober.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency + 1) as pool:
+            ingestion = pool.submit(ingest, base_url, uploads) if uploads else None
+            results = list(pool.map(lambda _: chat(base_url, document_id), range(args.requests)))
+            ingest_seconds = ingestion.result() if ingestion else 0
+        elapsed = time.perf_counter() - start
+        stop.set()
+        prober.join()
+    finally:
+        stop.set()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    errors = len(results) - len(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0
+    line = (f"{worker_class:<8} {len(latencies) / elapsed:>8.1f} req/s   "
+            f"p50 {statistics.median(latencies) * 1000 if latencies else 0:>7.0f} ms   "
+            f"p95 {p95 * 1000:>7.0f} ms   errores {errors}")
+    if uploads:
+        line += (f"   {len(uploads)} ingestas en {ingest_seconds:.1f}s, "
+                 f"/stats máx {max(gaps, default=0) * 1000:.0f} ms")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--worker-class', nargs='+', default=['sync', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.5, help='latencia fija del Gemini falso (s)')
+    parser.add_argument('--uploads', type=int, default=0, help='DOCX grandes a ingerir durante la carga')
+    parser.add_argument('--upload-pages', type=int, default=3000, help='páginas de cada DOCX')
+    args = parser.parse_args()
+
+    gemini = serve(latency=args.latency, token_rate=2000)
+    document = make_pdf(document_pages(5))
+    # Una semilla por subida y un CACHE_DIR por ejecución: ningún documento sale de la caché de ingesta
+    uploads = [make_docx(document_pages(args.upload_pages, seed=1000 + i)) for i in range(args.uploads)]
+    print(f"{args.workers} workers, {args.concurrency} clientes, {args.requests} solicitudes, "
+          f"latencia de Gemini {args.latency}s")
+    for worker_class in args.worker_class:
+        run(worker_class, args, gemini.url, document, uploads)
+    gemini.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""Benchmark de extremo a extremo de /process, /suggestions, /chat y /complement.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.run_e2e --pages 40 --documents 8 --output e2e.json
+    python -m benchmarks.run_e2e --pages 40 --documents 8 --compare e2e.json
+
+Levanta el Gemini falso de benchmarks/fake_gemini.py y la aplicación con
+gunicorn, sube PDF y DOCX sintéticos distintos (sin aciertos de caché) y
+recorre cada endpoint con `--concurrency` clientes. Informa rendimiento y
+p50/p95/p99 por endpoint y por etapa: las etapas salen de la cabecera
+Server-Timing cuando la aplicación la envía y la etapa `llm` del tiempo que
+el Gemini falso dedicó a las llamadas de cada fase. `--output` guarda los
+resultados en JSON y `--compare` los contrasta con una ejecución anterior.
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini import serve  # noqa: E402
+from benchmarks.load_test import ROOT, free_port, start_app  # noqa: E402
+from benchmarks.synthetic import WORDS, document_pages, make_docx, make_pdf  # noqa: E402
+
+DOCUMENT_TYPES = {
+    'pdf': (make_pdf, 'application/pdf'),
+    'docx': (make_docx, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+    }
+
+
+def parse_server_timing(header):
+    """'extract;dur=12.5, llm;dur=480' -> {'extract': 0.0125, 'llm': 0.48}"""
+    stages = {}
+    for entry in (header or '').split(','):
+        name, _, params = entry.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if name and key == 'dur':
+                stages[name] = stages.get(name, 0.0) + float(value) / 1000
+    return stages
+
+
+def call(base_url, path, body=None, upload=None):
+    """Devuelve (ok, segundos, cabecera Server-Timing, JSON de la respuesta)"""
+    headers = {'User-Agent': 'e2e'}
+    if upload is not None:
+        filename, content, content_type = upload
+        boundary = uuid.uuid4().hex
+        data = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+                f"Content-Type: {content_type}\r\n\r\n").encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+    else:
+        data = json.dumps(body).encode()
+        headers['Content-Type'] = 'application/json'
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(base_url + path, data=data, headers=headers),
+                                    timeout=300) as response:
+            payload = json.load(response)
+            return True, time.perf_counter() - start, response.headers.get('Server-Timing'), payload
+    except (urllib.error.URLError, OSError, ValueError):
+        return False, time.perf_counter() - start, None, None
+
+
+def run_phase(name, requests, concurrency, gemini):
+    """Ejecuta `requests` (funciones sin argumentos) y agrega latencias y etapas"""
+    with gemini.lock:
+        first_call = len(gemini.calls)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda request: request(), requests))
+    elapsed = time.perf_counter() - start
+    with gemini.lock:
+        llm_calls = [dict(c) for c in gemini.calls[first_call:]]
+
+    latencies = [seconds for ok, seconds, _, _ in results if ok]
+    stages = defaultdict(list)
+    for ok, _, timing, _ in results:
+        for stage, seconds in parse_server_timing(timing).items():
+            stages[stage].append(seconds)
+    stages['llm'] = [c['duration'] for c in llm_calls if 'duration' in c]
+
+    summary = dict(summarize(latencies),
+                   errors=len(results) - len(latencies),
+                   throughput_rps=round(len(latencies) / elapsed, 2),
+                   llm_calls=len(llm_calls),
+                   prompt_tokens=sum(c['prompt_tokens'] for c in llm_calls))
+    summary['stages'] = {stage: summarize(values) for stage, values in sorted(stages.items()) if values}
+    print(f"{name:<14} {summary['throughput_rps']:>7.2f} req/s   p50 {summary.get('p50_ms', 0):>8.1f} ms   "
+          f"p95 {summary.get('p95_ms', 0):>8.1f} ms   p99 {summary.get('p99_ms', 0):>8.1f} ms   "
+          f"errores {summary['errors']}")
+    return summary, results
+
+
+def compare(previous, current):
+    print(f"\nComparación con {previous['meta']['timestamp']} ({previous['meta'].get('commit', '?')})")
+    workers = (previous['meta'].get('pdf_extract_workers'), current['meta']['pdf_extract_workers'])
+    if workers[0] != workers[1]:
+        print(f"Aviso: PDF_EXTRACT_WORKERS distinto ({workers[0]} → {workers[1]}), /process no es comparable")
+    for name, now in current['endpoints'].items():
+        before = previous['endpoints'].get(name)
+        if not before or not before.get('count') or not now.get('count'):
+            continue
+        deltas = []
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            change = (now[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            deltas.append(f"{metric.split('_')[0]} {before[metric]:>8.1f} → {now[metric]:>8.1f} ({change:+6.1f}%)")
+        print(f"{name:<14} " + '   '.join(deltas))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20, help='páginas por documento')
+    parser.add_argument('--paragraphs-per-page', type=int, default=4)
+    parser.add_argument('--documents', type=int, default=6, help='documentos por formato')
+    parser.add_argument('--questions', type=int, default=30, help='solicitudes de /chat y /complement')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--worker-class', default='gevent')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.3, help='latencia fija del Gemini falso (s)')
+    parser.add_argument('--prefill-rate', type=float, default=20000.0, help='tokens de entrada por segundo')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='tokens de salida por segundo')
+    parser.add_argument('--pdf-workers', type=int,
+                        help='PDF_EXTRACT_WORKERS de la aplicación (por omisión, el suyo)')
+    parser.add_argument('--output', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--compare', help='resultados JSON de una ejecución anterior')
+    args = parser.parse_args()
+
+    gemini = serve(latency=args.latency, prefill_rate=args.prefill_rate, token_rate=args.token_rate)
+    extra_env = {'SERVER_TIMING': '1'}
+    if args.pdf_workers is not None:
+        extra_env['PDF_EXTRACT_WORKERS'] = str(args.pdf_workers)
+    process, base_url = start_app(args.worker_class, args.workers, gemini.url, free_port(), **extra_env)
+    endpoints = {}
+    try:
+        documents = []
+        for kind, (build, content_type) in DOCUMENT_TYPES.items():
+            # Una semilla distinta por archivo para no acertar en la caché de subidas
+            files = [(f"e2e-{seed}.{kind}",
+                      build(document_pages(args.pages, args.paragraphs_per_page, seed=seed)), content_type)
+                     for seed in range(len(documents), len(documents) + args.documents)]
+            print(f"{kind}: {args.documents} archivos de {args.pages} páginas, "
+                  f"{sum(len(f[1]) for f in files) / len(files) / 1024:,.0f} KiB de media")
+            endpoints[f"process_{kind}"], results = run_phase(
+                f"/process {kind}", [lambda f=f: call(base_url, '/process', upload=f) for f in files],
+                args.concurrency, gemini)
+            documents += [(payload['document_id'], payload['total_paragraphs'])
+                          for ok, _, _, payload in results if ok]
+
+        if not documents:
+            raise RuntimeError("No se pudo procesar ningún documento")
+
+        endpoints['suggestions'], _ = run_phase(
+            "/suggestions", [lambda d=d: call(base_url, '/suggestions', {'document_id': d})
+                             for d, _ in documents], args.concurrency, gemini)
+
+        questions = [f"¿Qué relación hay entre {WORDS[i % len(WORDS)]} y {WORDS[(i * 7 + 3) % len(WORDS)]}?"
+                     for i in range(args.questions)]
+        endpoints['chat'], _ = run_phase(
+            "/chat", [lambda i=i, q=q: call(base_url, '/chat', {'document_id': documents[i % len(documents)][0],
+                                                                'question': q})
+                      for i, q in enumerate(questions)], args.concurrency, gemini)
+
+        endpoints['complement'], _ = run_phase(
+            "/complement", [lambda i=i: call(base_url, '/complement', {
+                'document_id': documents[i % len(documents)][0],
+                'paragraph': (i // len(documents)) % documents[i % len(documents)][1]})
+                for i in range(args.questions)], args.concurrency, gemini)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+        gemini.shutdown()
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "args": vars(args),
+            # Como lo resuelve app.py: la variable si se fijó, o los CPU repartidos entre los workers
+            "pdf_extract_workers": int(extra_env.get('PDF_EXTRACT_WORKERS') or os.getenv(
+                'PDF_EXTRACT_WORKERS', max(1, (os.cpu_count() or 1) // args.workers))),
+        },
+        "endpoints": endpoints,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Generación de documentos sintéticos (PDF, DOCX y texto) para los benchmarks."""
+import io
+import os
+import random
+import zipfile
+
+WORDS = (
+    "célula membrana proteína energía análisis método resultado hipótesis muestra "
+    "variable modelo teoría evidencia estudio datos población experimento control "
+    "síntesis estructura función sistema proceso factor respuesta efecto nivel "
+    "mecanismo regulación expresión genética molecular tejido organismo ambiente "
+    "temperatura presión concentración reacción enzima metabolismo ciclo fase "
+    "historia sociedad economía política cultura educación lenguaje derecho"
+).split()
+
+
+def random_paragraph(rng, sentences=5):
+    result = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+        result.append(' '.join(words).capitalize() + '.')
+    return ' '.join(result)
+
+
+def document_pages(pages, paragraphs_per_page=4, seed=0):
+    """Lista de páginas, cada una como lista de párrafos aleatorios"""
+    rng = random.Random(seed)
+    return [[random_paragraph(rng) for _ in range(paragraphs_per_page)]
+            for _ in range(pages)]
+
+
+def wrap(text, width=90, hyphenate=False):
+    lines, current = [], ''
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            room = width - len(current) - 2
+            if hyphenate and len(word) >= 8 and room >= 3:
+                # Cortar la palabra con guion como hace la maquetación de un libro
+                cut = min(room, len(word) - 3)
+                lines.append(f"{current} {word[:cut]}-")
+                current = word[cut:]
+                continue
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+
+def make_pdf(pages, header=None, footer=True, hyphenate=False):
+    """Construye un PDF mínimo (Helvetica, una columna) a partir de páginas de párrafos.
+
+    `header` añade un encabezado repetido en cada página, `footer` el número
+    de página y `hyphenate` corta palabras largas con guion al final de
+    línea, como en los documentos reales.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = add(b"")
+    kids = []
+
+    for number, paragraphs in enumerate(pages, 1):
+        lines = [header, ''] if header else []
+        for paragraph in paragraphs:
+            lines.extend(wrap(paragraph, hyphenate=hyphenate))
+            lines.append('')
+        if footer:
+            lines.append(str(number))
+
+        ops = ["BT /F1 9 Tf 40 770 Td 11 TL"]
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = '\n'.join(ops).encode('cp1252', 'replace')
+
+        contents = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font, contents)
+        ))
+
+    objects[pages_id - 1] = (b"<< /Type /Pages /Kids [" +
+                             b" ".join(b"%d 0 R" % k for k in kids) +
+                             b"] /Count %d >>" % len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += (b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, catalog, xref))
+    return bytes(out)
+
+
+def make_docx(pages, header=None):
+    """Construye un DOCX con un salto de página tras cada página de párrafos"""
+    from docx import Document
+
+    document = Document()
+    if header:
+        document.sections[0].header.paragraphs[0].text = header
+    for number, paragraphs in enumerate(pages, 1):
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+        if number < len(pages):
+            document.add_page_break()
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def write_scanned_pdf(path, pages, image_bytes):
+    """Escribe en `path` un PDF tipo libro escaneado: cada página lleva una imagen
+    de `image_bytes` bytes (ruido, incomprimible) y su texto.
+
+    Se escribe objeto a objeto para que el PDF no tenga que caber en memoria.
+    """
+    side = int(image_bytes ** 0.5)
+    offsets = []
+    with open(path, 'wb') as out:
+        def add(number, body, stream=None):
+            offsets.append((number, out.tell()))
+            out.write(b"%d 0 obj\n" % number + body)
+            if stream is not None:
+                out.write(b"\nstream\n")
+                for start in range(0, len(stream), 1024 * 1024):
+                    out.write(stream[start:start + 1024 * 1024])
+                out.write(b"\nendstream")
+            out.write(b"\nendobj\n")
+
+        out.write(b"%PDF-1.4\n")
+        add(1, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        kids = []
+        for number, paragraphs in enumerate(pages):
+            first = 4 + number * 3
+            ops = ["q 572 0 0 752 20 20 cm /Im1 Do Q", "BT /F1 9 Tf 40 770 Td 11 TL"]
+            for paragraph in paragraphs:
+                for line in wrap(paragraph) + ['']:
+                    ops.append(f"({line}) Tj T*")
+            ops.append("ET")
+            text = '\n'.join(ops).encode('cp1252', 'replace')
+            add(first, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                       b"/BitsPerComponent 8 /Length %d >>" % (side, side, side * side), os.urandom(side * side))
+            add(first + 1, b"<< /Length %d >>" % len(text), text)
+            add(first + 2, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                           b"/Resources << /Font << /F1 1 0 R >> /XObject << /Im1 %d 0 R >> >> /Contents %d 0 R >>"
+                           % (first, first + 1))
+            kids.append(first + 2)
+        add(2, b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids))
+        add(3, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        offsets.sort()
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for _, offset in offsets:
+            out.write(b"%010d 00000 n \n" % offset)
+        out.write(b"trailer\n<< /Size %d /Root 3 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+
+
+def write_docx_with_media(path, pages, media_bytes):
+    """Escribe en `path` un DOCX con el texto de `pages` y `media_bytes` bytes de
+    imágenes (ruido sin comprimir en word/media), como un documento con fotos."""
+    with open(path, 'wb') as out:
+        out.write(make_docx(pages))
+    with zipfile.ZipFile(path, 'a') as package:
+        for number, start in enumerate(range(0, media_bytes, 4 * 1024 * 1024)):
+            with package.open(f"word/media/scan{number}.bin", 'w') as media:
+                media.write(os.urandom(min(4 * 1024 * 1024, media_bytes - start)))
@@ -0,0 +1,280 @@
+"""Empaqueta y minifica los recursos estáticos para producción.
+
+Uso (desde la raíz del repositorio; el Dockerfile lo ejecuta al construir):
+
+    python build_assets.py
+
+Une static/js/app.js y los módulos que importa en un solo módulo ES (en
+orden de dependencias, como un bundler con scope hoisting), minifica ese
+archivo y static/css/styles.css y los escribe en static/dist con el hash
+del contenido en el nombre, junto con sus variantes .gz y .br. El manifiesto
+static/dist/manifest.json relaciona cada recurso con su archivo y su hash
+SRI; con ASSET_BUNDLES=1 app.py lo usa para servirlos con caché inmutable y,
+si no existe o es anterior a los fuentes, vuelve a los archivos originales.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+
+ENTRIES = {
+    'js/app.js': 'app.js',
+    'css/styles.css': 'styles.css',
+}
+
+IMPORT = re.compile(r'^import\s*\{([^}]*)\}\s*from\s*[\'"](\.[^\'"]+)[\'"];?[ \t]*\n?', re.MULTILINE)
+EXPORT = re.compile(r'^export\s+(?=(?:async\s+)?function\b|const\b|let\b|class\b)', re.MULTILINE)
+TOP_LEVEL = re.compile(r'^(?:(?:async\s+)?function\s*\*?\s*|(?:const|let|var|class)\s+)([A-Za-z_$][\w$]*)',
+                       re.MULTILINE)
+EXPORT_LINE = re.compile(r'^export\s+(.*)$', re.MULTILINE)
+# Signos junto a los que un espacio nunca es necesario
+TIGHT = set('{}()[];,:=<>?!&|*%^~')
+
+# Tras estos caracteres o palabras, una `/` abre una expresión regular y no es una división
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+
+
+class BuildError(Exception):
+    pass
+
+
+def bundle_js(entry_path):
+    """Concatena el módulo de entrada y sus importaciones relativas en orden de dependencias"""
+    ordered, visiting, exports = [], set(), {}
+
+    def visit(path):
+        if path in exports:
+            return
+        if path in visiting:
+            raise BuildError(f"Importación circular en {os.path.relpath(path, ROOT)}")
+        visiting.add(path)
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+
+        for names, target in IMPORT.findall(source):
+            target_path = os.path.normpath(os.path.join(os.path.dirname(path), target))
+            visit(target_path)
+            for name in (n.strip() for n in names.split(',')):
+                if not name:
+                    continue
+                if ' as ' in name:
+                    raise BuildError(f"Alias de importación no soportado en {os.path.relpath(path, ROOT)}: {name}")
+                if name not in exports[target_path]:
+                    raise BuildError(f"{os.path.relpath(target_path, ROOT)} no exporta {name}")
+
+        body = EXPORT.sub('', IMPORT.sub('', source))
+        if re.search(r'^\s*(?:import|export)\b', body, re.MULTILINE):
+            raise BuildError(f"Sintaxis de módulo no soportada en {os.path.relpath(path, ROOT)}")
+        exports[path] = set(TOP_LEVEL.findall('\n'.join(EXPORT_LINE.findall(source))))
+        visiting.discard(path)
+        ordered.append((path, body))
+
+    visit(entry_path)
+
+    # Todos los módulos comparten un ámbito: dos declaraciones con el mismo nombre chocarían
+    owners = {}
+    for path, body in ordered:
+        for name in TOP_LEVEL.findall(body):
+            if name in owners:
+                raise BuildError(f"`{name}` está declarado en {os.path.relpath(owners[name], ROOT)} "
+                                 f"y en {os.path.relpath(path, ROOT)}")
+            owners[name] = path
+
+    return '\n'.join(f"// {os.path.relpath(path, STATIC_DIR)}\n{body}" for path, body in ordered)
+
+
+def _scan_quoted(source, i, quote):
+    """Índice tras la cadena '...' o "..." que empieza en i"""
+    j = i + 1
+    while j < len(source):
+        if source[j] == '\\':
+            j += 2
+            continue
+        if source[j] == quote:
+            return j + 1
+        if source[j] == '\n':
+            raise BuildError("Cadena sin cerrar")
+        j += 1
+    raise BuildError("Cadena sin cerrar")
+
+
+def _scan_template(source, i):
+    """Desde el texto de una plantilla, devuelve (índice, True) tras la ` de cierre o (índice, False) tras `${`"""
+    j = i
+    while j < len(source):
+        if source[j] == '\\':
+            j += 2
+            continue
+        if source[j] == '`':
+            return j + 1, True
+        if source.startswith('${', j):
+            return j + 2, False
+        j += 1
+    raise BuildError("Plantilla sin cerrar")
+
+
+def _scan_regex(source, i):
+    j, in_class = i + 1, False
+    while j < len(source):
+        c = source[j]
+        if c == '\\':
+            j += 2
+            continue
+        if c == '\n':
+            raise BuildError("Expresión regular sin cerrar")
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            j += 1
+            while j < len(source) and (source[j].isalnum() or source[j] == '_'):
+                j += 1
+            return j
+        j += 1
+    raise BuildError("Expresión regular sin cerrar")
+
+
+def minify_js(source):
+    """Minificación conservadora: quita comentarios, sangrías y líneas vacías.
+
+    Respeta cadenas, plantillas (también anidadas) y expresiones regulares, y
+    conserva los saltos de línea para no depender de la inserción automática de `;`.
+    """
+    out = []
+    braces = []  # profundidad de llaves de cada `${` abierto
+    depth = 0
+    last = ''  # último carácter significativo de código
+    last_word = ''
+    i, n = 0, len(source)
+
+    def emit(text):
+        out.append(text)
+
+    while i < n:
+        c = source[i]
+        if c in '\'"':
+            j = _scan_quoted(source, i, c)
+            emit(source[i:j])
+            last, last_word, i = 'a', '', j
+        elif c == '`' or (c == '}' and depth == 0 and braces):
+            if c == '}':
+                depth = braces.pop()
+            j, closed = _scan_template(source, i + 1)
+            emit(source[i:j])
+            if not closed:
+                braces.append(depth)
+                depth = 0
+            last, last_word, i = ('a' if closed else '{'), '', j
+        elif source.startswith('//', i):
+            i = source.find('\n', i)
+            i = n if i == -1 else i
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if end == -1:
+                raise BuildError("Comentario sin cerrar")
+            i = end + 2
+        elif c == '/' and (last in REGEX_PRECEDERS or last == '' or last_word in REGEX_KEYWORDS):
+            j = _scan_regex(source, i)
+            emit(source[i:j])
+            last, last_word, i = 'a', '', j
+        elif c in ' \t\r\n':
+            j = i
+            while j < n and source[j] in ' \t\r\n':
+                j += 1
+            if '\n' in source[i:j]:
+                if out and out[-1] == ' ':
+                    out.pop()
+                if out and not out[-1].endswith('\n'):
+                    emit('\n')
+            elif out and j < n and out[-1][-1] not in TIGHT | {' ', '\n'} and source[j] not in TIGHT:
+                emit(' ')
+            i = j
+        else:
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+            if c.isalnum() or c in '_$':
+                j = i
+                while j < n and (source[j].isalnum() or source[j] in '_$'):
+                    j += 1
+                last_word = source[i:j]
+                emit(last_word)
+                last, i = 'a', j
+                continue
+            emit(c)
+            last, last_word, i = c, '', i + 1
+
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.DOTALL)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+
+def write_asset(name, content):
+    """Escribe `nombre.<hash>.ext` con sus variantes comprimidas y devuelve la entrada del manifiesto"""
+    data = content.encode('utf-8')
+    stem, ext = os.path.splitext(name)
+    filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    path = os.path.join(DIST_DIR, filename)
+
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        print("  aviso: falta el paquete brotli, no se genera la variante .br")
+    else:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+    sizes = ', '.join(f"{suffix or 'sin comprimir'} {os.path.getsize(path + suffix) / 1024:.1f} KiB"
+                      for suffix in ('', '.gz', '.br') if os.path.exists(path + suffix))
+    print(f"  {filename}: {sizes}")
+    return {
+        "file": filename,
+        "integrity": "sha384-" + base64.b64encode(hashlib.sha384(data).digest()).decode('ascii')
+    }
+
+
+def main():
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for source, name in ENTRIES.items():
+        path = os.path.join(STATIC_DIR, source)
+        if source.endswith('.js'):
+            content = minify_js(bundle_js(path))
+        else:
+            with open(path, encoding='utf-8') as f:
+                content = minify_css(f.read())
+        manifest[source] = write_asset(name, content)
+
+    with open(os.path.join(DIST_DIR, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Manifiesto escrito en {os.path.relpath(os.path.join(DIST_DIR, 'manifest.json'), ROOT)}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except BuildError as e:
+        sys.exit(f"Error al construir los recursos: {e}")
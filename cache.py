@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def content_hash(*parts):
+    """Calcula un hash SHA-256 estable a partir de cadenas, bytes o archivos abiertos.
+
+    Los archivos se leen por bloques desde el principio, sin cargarlos enteros.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        if hasattr(part, 'read'):
+            part.seek(0)
+            for block in iter(lambda: part.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        else:
+            digest.update(part)
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """Caché en dos niveles: LRU en memoria por proceso y disco compartido entre workers.
+
+    Los valores deben ser serializables a JSON. Las entradas caducan tras
+    `ttl` segundos sin accesos y cada nivel se recorta por tamaño en bytes.
+    """
+
+    def __init__(self, name, directory, max_memory_bytes, max_disk_bytes, ttl):
+        self.name = name
+        self.directory = os.path.join(directory, name)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+
+        self._memory = OrderedDict()  # key -> (valor, tamaño, último acceso)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, size, last_access = entry
+                if now - last_access <= self.ttl:
+                    self._memory[key] = (value, size, now)
+                    self._memory.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return value
+                self._drop_memory(key)
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['disk_hits'] += 1
+            self._store_memory(key, value, self._size_of(value), now)
+        return value
+
+    def set(self, key, value):
+        payload = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, value, len(payload), now)
+        self._write_disk(key, payload)
+
+    def delete(self, key):
+        with self._lock:
+            self._drop_memory(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters,
+                        memory_entries=len(self._memory),
+                        memory_bytes=self._memory_bytes)
+
+    # Nivel en memoria
+
+    def _store_memory(self, key, value, size, now):
+        self._drop_memory(key)
+        if size > self.max_memory_bytes:
+            return
+        self._memory[key] = (value, size, now)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self._counters['evictions'] += 1
+
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+
+    @staticmethod
+    def _size_of(value):
+        return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+    # Nivel en disco (compartido entre procesos)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key, now):
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                value = json.loads(f.read().decode('utf-8'))
+            os.utime(path, None)  # El mtime marca el último acceso
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, payload):
+        if len(payload) > self.max_disk_bytes:
+            return
+        try:
+            # Escritura atómica para que otros workers nunca lean un archivo a medias
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith('.json'):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if now - st.st_mtime > self.ttl:
+                        self._remove_file(entry.path)
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError:
+            return
+
+        # Expulsar primero los archivos usados hace más tiempo
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+            with self._lock:
+                self._counters['evictions'] += 1
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,69 @@
+import math
+import re
+from collections import Counter
+
+CHARS_PER_TOKEN = 4  # estimación habitual para texto en español e inglés
+EDGE_LINES = 3  # líneas al principio y al final de cada página donde buscar encabezados y pies
+
+PAGE_NUMBER = re.compile(
+    r'^(?:p[áa]g(?:ina)?\.?\s*)?[-–—]?\s*\d{1,4}\s*[-–—]?(?:\s*(?:de|/|of)\s*\d{1,4})?$',
+    re.IGNORECASE
+)
+HYPHENATED = re.compile(r'(\w)-\n([a-záéíóúüñ])')
+SPACES = re.compile(r'[ \t\u00a0]+')
+LINE_EDGES = re.compile(r' *\n *')
+BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _signature(line):
+    """Forma normalizada de una línea: los números cambian de página en página"""
+    return SPACES.sub(' ', re.sub(r'\d+', '#', line.strip().lower()))
+
+
+def _edge_indices(lines):
+    """Índices de las primeras y últimas EDGE_LINES líneas no vacías de la página"""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+
+def compact_pages(pages, min_repeat=0.5):
+    """Une las páginas de un PDF eliminando el texto que no aporta al prompt.
+
+    Quita los encabezados y pies que se repiten en al menos `min_repeat` de
+    las páginas y los números de página, une las palabras cortadas con guion
+    al final de línea y colapsa los espacios. Conserva las líneas en blanco
+    dobles como separación de párrafos. Devuelve (texto, estadísticas).
+    """
+    split = [page.split('\n') for page in pages]
+    edges = [_edge_indices(lines) for lines in split]
+
+    counts = Counter()
+    for lines, indices in zip(split, edges):
+        counts.update({_signature(lines[i]) for i in indices})
+    threshold = max(2, math.ceil(min_repeat * len(pages)))
+    repeated = {signature for signature, n in counts.items() if n >= threshold}
+
+    kept_pages, removed = [], 0
+    for lines, indices in zip(split, edges):
+        kept = []
+        for i, line in enumerate(lines):
+            if i in indices and (_signature(line) in repeated or PAGE_NUMBER.match(line.strip())):
+                removed += 1
+                continue
+            kept.append(line)
+        # Un salto de página no es un salto de párrafo: el texto puede continuar
+        kept_pages.append('\n'.join(kept).strip())
+
+    text = '\n'.join(kept_pages)
+    text = LINE_EDGES.sub('\n', SPACES.sub(' ', text))
+    text, hyphenations = HYPHENATED.subn(r'\1\2', text)
+    text = BLANK_LINES.sub('\n\n', text).strip()
+
+    chars_before = sum(len(page) for page in pages)
+    return text, {
+        "chars_before": chars_before,
+        "chars_after": len(text),
+        "tokens_saved": (chars_before - len(text)) // CHARS_PER_TOKEN,
+        "boilerplate_lines": removed,
+        "hyphenations": hyphenations
+    }
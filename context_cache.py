@@ -0,0 +1,124 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import google.generativeai as genai
+import requests
+from google.api_core.exceptions import ClientError, GoogleAPIError
+from google.auth.exceptions import TransportError
+
+from cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Fallos de Gemini tras los que conviene usar el prompt completo: errores de la
+# API (y reintentos agotados) y, con GEMINI_TRANSPORT=rest, los de red de requests
+UPSTREAM_ERRORS = (GoogleAPIError, requests.exceptions.RequestException, TransportError)
+
+
+class ContextCache:
+    """Contextos cacheados en Gemini (instrucciones + documento), uno por documento.
+
+    El documento se registra una sola vez con un TTL y los turnos siguientes
+    envían solo la pregunta. El nombre del recurso se comparte entre workers
+    en `store` (un SQLiteCache con TTL algo menor que el de Gemini) y la
+    creación pasa por `coalescer` para no duplicarla. Si Gemini rechaza el
+    contexto (modelo sin soporte, documento por debajo del mínimo) se
+    recuerda y `model_for` devuelve None: el llamador usa el prompt completo.
+    """
+
+    def __init__(self, store, coalescer, model_name, ttl, min_chars, max_models=32):
+        self.store = store
+        self.coalescer = coalescer
+        self.model_name = model_name
+        self.ttl = ttl
+        self.min_chars = min_chars
+        self.max_models = max_models
+
+        self._models = OrderedDict()  # nombre del contexto -> GenerativeModel (por worker)
+        self._lock = threading.Lock()
+        self._counters = {'created': 0, 'reused': 0, 'unavailable': 0}
+
+    def model_for(self, key, system_instruction, document_text):
+        """Modelo ligado al contexto del documento `key`, creándolo si hace falta, o None"""
+        if len(document_text) < self.min_chars:
+            return None
+
+        entry = self.store.get(key)
+        if entry is None:
+            try:
+                entry = self.coalescer.do(
+                    self._flight_key(key),
+                    lambda: self._create(key, system_instruction, document_text)
+                )
+            except UPSTREAM_ERRORS as e:
+                # Error transitorio: este turno usa el prompt completo y el siguiente reintenta
+                logger.warning(f"No se pudo crear el contexto cacheado: {str(e)}")
+                self._count('unavailable')
+                return None
+        elif entry['name'] is not None:
+            self._count('reused')
+
+        if entry['name'] is None:
+            self._count('unavailable')
+            return None
+        try:
+            return self._model(entry['name'])
+        except UPSTREAM_ERRORS as e:
+            logger.warning(f"Contexto cacheado no disponible: {str(e)}")
+            self.invalidate(key)
+            self._count('unavailable')
+            return None
+
+    def invalidate(self, key):
+        """Olvida el contexto del documento (p. ej. si Gemini lo borró antes de tiempo)"""
+        entry = self.store.get(key)
+        self.store.delete(key)
+        self.coalescer.forget(self._flight_key(key))
+        if entry and entry['name']:
+            with self._lock:
+                self._models.pop(entry['name'], None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _flight_key(self, key):
+        return content_hash('context-cache', self.model_name, key)
+
+    def _create(self, key, system_instruction, document_text):
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=self.model_name,
+                display_name=f"lector-{key}",
+                system_instruction=system_instruction,
+                contents=[document_text],
+                ttl=self.ttl
+            )
+            entry = {"name": cached.name}
+            self._count('created')
+        except ClientError as e:
+            # 4xx: repetir la solicitud no cambiaría el resultado hasta que caduque la entrada
+            logger.warning(f"Gemini rechazó el contexto cacheado: {str(e)}")
+            entry = {"name": None}
+        self.store.set(key, entry)
+        return entry
+
+    def _model(self, name):
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None:
+                self._models.move_to_end(name)
+                return model
+
+        model = genai.GenerativeModel.from_cached_content(cached_content=name)
+
+        with self._lock:
+            self._models[name] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
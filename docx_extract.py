@@ -0,0 +1,85 @@
+import posixpath
+import zipfile
+
+from lxml import etree
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+PACKAGE_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+# Equivalente textual de los elementos de un run, como en python-docx
+RUN_TEXT = {W + 'tab': '\t', W + 'ptab': '\t', W + 'cr': '\n', W + 'noBreakHyphen': '-'}
+
+
+class DocxError(Exception):
+    """El archivo no es un DOCX legible"""
+
+
+def _main_part(package):
+    """Nombre dentro del ZIP de la parte principal (normalmente word/document.xml)"""
+    try:
+        rels = etree.fromstring(package.read('_rels/.rels'), etree.XMLParser(resolve_entities=False))
+    except KeyError:
+        raise DocxError("Falta _rels/.rels")
+    for rel in rels.iter(PACKAGE_RELS):
+        if rel.get('Type') == OFFICE_DOCUMENT:
+            return posixpath.normpath(rel.get('Target', '').lstrip('/'))
+    raise DocxError("No hay documento principal")
+
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        if child.tag == W + 't':
+            parts.append(child.text or '')
+        elif child.tag == W + 'br':
+            # Los saltos de página y de columna no aportan texto
+            parts.append('\n' if child.get(W + 'type', 'textWrapping') == 'textWrapping' else '')
+        else:
+            parts.append(RUN_TEXT.get(child.tag, ''))
+    return ''.join(parts)
+
+
+def _paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == W + 'r':
+            parts.append(_run_text(child))
+        elif child.tag == W + 'hyperlink':
+            parts.extend(_run_text(run) for run in child if run.tag == W + 'r')
+    return ''.join(parts)
+
+
+def is_docx(file):
+    """Comprueba que el archivo es un ZIP con documento principal, sin leer su contenido"""
+    try:
+        with zipfile.ZipFile(file) as package:
+            return _main_part(package) in package.namelist()
+    except (zipfile.BadZipFile, DocxError, etree.XMLSyntaxError):
+        return False
+
+
+def iter_paragraphs(file):
+    """Texto de cada párrafo del cuerpo del documento, en orden.
+
+    Equivale a `[p.text for p in Document(file).paragraphs]` pero lee el XML
+    en streaming desde el archivo (ruta o archivo abierto) y libera cada
+    elemento al terminarlo: la memoria no crece con el tamaño del DOCX ni con
+    sus imágenes, que python-docx cargaría enteras. Lanza DocxError si el
+    archivo está dañado.
+    """
+    try:
+        with zipfile.ZipFile(file) as package, package.open(_main_part(package)) as xml:
+            for event, element in etree.iterparse(xml, events=('end',), resolve_entities=False,
+                                                  no_network=True, huge_tree=True):
+                parent = element.getparent()
+                if parent is None or parent.tag != W + 'body':
+                    continue
+                # Solo los párrafos de primer nivel, como Document.paragraphs (no tablas ni cuadros)
+                if element.tag == W + 'p':
+                    yield _paragraph_text(element)
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as e:
+        raise DocxError(str(e))
@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Configuración de gunicorn para producción: gunicorn -c gunicorn.conf.py app:app
+#
+# Con workers gevent cada proceso atiende muchas solicitudes a la vez: mientras
+# una espera la respuesta de Gemini, las demás siguen avanzando. El trabajo de
+# CPU de la ingesta se ejecuta en el threadpool del hub (run_blocking en app.py)
+# para no detenerlas. Usa GUNICORN_WORKER_CLASS=gthread (hilos) o sync para
+# volver a un modelo bloqueante.
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))  # gevent
+if worker_class == 'gthread':
+    # Con sync, threads > 1 haría que gunicorn cambiara a gthread por su cuenta
+    threads = int(os.getenv('GUNICORN_THREADS', 32))
+
+# Las respuestas en streaming pueden durar lo mismo que una generación completa
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+# Métricas de Prometheus compartidas: cada worker escribe en este directorio y
+# /metrics suma los archivos de todos (ver metrics.py)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'lector-metrics'))
+
+
+def on_starting(server):
+    # Los archivos de una ejecución anterior falsearían los totales
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
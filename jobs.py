@@ -0,0 +1,65 @@
+import logging
+import queue
+import secrets
+import time
+
+from workers import WorkerQueue
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """La cola de trabajos en segundo plano está llena"""
+
+
+class JobQueue(WorkerQueue):
+    """Cola acotada de trabajos atendida por hilos locales del worker.
+
+    El estado de cada trabajo se guarda en `store` (un SQLiteCache) para que
+    cualquier worker pueda responder a las consultas de progreso.
+    """
+
+    thread_name = 'job-worker'
+
+    def __init__(self, store, workers, max_pending, progress_interval=0.5):
+        super().__init__(workers, max_pending)
+        self.store = store
+        self.progress_interval = progress_interval
+
+    def submit(self, func, *args):
+        """Encola `func(*args, on_progress=...)` y devuelve el id del trabajo.
+
+        `func` debe devolver un resultado serializable a JSON.
+        """
+        job_id = secrets.token_hex(16)
+        self.store.set(job_id, {"status": "queued", "pages_done": 0, "pages_total": 0})
+        try:
+            self._put((job_id, func, args))
+        except queue.Full:
+            self.store.delete(job_id)
+            raise QueueFull()
+        return job_id
+
+    def status(self, job_id):
+        return self.store.get(job_id)
+
+    def _execute(self, job_id, func, args):
+        state = {"status": "running", "pages_done": 0, "pages_total": 0}
+        self.store.set(job_id, state)
+        last_update = [0.0]
+
+        def on_progress(done, total):
+            state.update(pages_done=done, pages_total=total)
+            # Limitar escrituras: basta con refrescar el progreso cada pocos cientos de ms
+            now = time.monotonic()
+            if now - last_update[0] >= self.progress_interval or done == total:
+                last_update[0] = now
+                self.store.set(job_id, state)
+
+        try:
+            result = func(*args, on_progress=on_progress)
+            state.update(status="done", result=result)
+        except Exception as e:
+            logger.error(f"Error en trabajo {job_id}: {str(e)}")
+            state.update(status="error", error=getattr(e, 'public_message', "Error al procesar el archivo"))
+        self.store.set(job_id, state)
@@ -0,0 +1,106 @@
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest, multiprocess)
+
+# Con PROMETHEUS_MULTIPROC_DIR definido (lo hace gunicorn.conf.py) cada worker escribe
+# sus valores en archivos de ese directorio y /metrics suma los de todos los procesos
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+STAGE_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+stage_seconds = Histogram(
+    'lector_stage_seconds', 'Duración de cada etapa del procesamiento', ['stage'],
+    buckets=STAGE_BUCKETS
+)
+request_seconds = Histogram(
+    'lector_request_seconds', 'Duración de las solicitudes HTTP hasta enviar las cabeceras',
+    ['endpoint', 'method', 'status'], buckets=STAGE_BUCKETS
+)
+llm_prompt_chars = Histogram(
+    'lector_llm_prompt_chars', 'Caracteres del prompt enviado a Gemini', ['mode'],
+    buckets=SIZE_BUCKETS
+)
+llm_response_chars = Histogram(
+    'lector_llm_response_chars', 'Caracteres de la respuesta de Gemini', ['mode'],
+    buckets=SIZE_BUCKETS
+)
+
+compaction_chars = Counter(
+    'lector_compaction_chars', 'Caracteres del texto de PDF antes y después de la compactación',
+    ['state']
+)
+speculative_suggestions = Counter(
+    'lector_speculative_suggestions',
+    'Sugerencias precalculadas al subir: encoladas, descartadas, completadas, canceladas, '
+    'fallidas, usadas por /suggestions o no listas a tiempo',
+    ['event']
+)
+
+
+def record_stage(stage, seconds):
+    """Registra la duración de una etapa y la anota para Server-Timing"""
+    stage_seconds.labels(stage).observe(seconds)
+    if has_request_context() and 'server_timing' in g:
+        g.server_timing[stage] = g.server_timing.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage):
+    """Mide el bloque (o la función, usado como decorador) como etapa `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_llm_call(mode, prompt_chars, response_chars):
+    llm_prompt_chars.labels(mode).observe(prompt_chars)
+    llm_response_chars.labels(mode).observe(response_chars)
+
+
+def record_compaction(chars_before, chars_after):
+    compaction_chars.labels('before').inc(chars_before)
+    compaction_chars.labels('after').inc(chars_after)
+
+
+def record_speculation(event):
+    speculative_suggestions.labels(event).inc()
+
+
+def render():
+    """Devuelve (cuerpo, content type) con las métricas en formato Prometheus"""
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app, server_timing=False):
+    """Mide cada solicitud y, si `server_timing`, añade la cabecera Server-Timing"""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.server_timing = {}
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('request_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        request_seconds.labels(request.endpoint or 'unmatched', request.method,
+                               str(response.status_code)).observe(elapsed)
+
+        if server_timing:
+            entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in g.server_timing.items()]
+            entries.append(f"total;dur={elapsed * 1000:.1f}")
+            response.headers['Server-Timing'] = ', '.join(entries)
+        return response
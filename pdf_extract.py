@@ -0,0 +1,206 @@
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+import io
+import logging
+import math
+import multiprocessing
+import signal
+import threading
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+
+class PageTimeout(BaseException):
+    """Una página superó el tiempo máximo de extracción.
+
+    Hereda de BaseException para que los `except Exception` internos de
+    PyPDF2 no la conviertan en un error de lectura.
+    """
+
+
+def _raise_timeout(signum, frame):
+    raise PageTimeout()
+
+
+@contextmanager
+def _stream(source):
+    """Archivo binario con el PDF: abre la ruta, envuelve los bytes o rebobina el archivo.
+
+    PdfReader copiaría a memoria el PDF entero si recibiera la ruta; con un
+    archivo abierto lee solo los objetos que necesita.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield f
+    elif isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        yield source
+
+
+def _open(stream):
+    stream.seek(0)
+    return PyPDF2.PdfReader(stream)
+
+
+def _page_text(reader, number):
+    try:
+        return reader.pages[number].extract_text() or ''
+    finally:
+        # PdfReader guarda cada objeto que resuelve, imágenes incluidas: vaciar la caché
+        # tras cada página evita que la memoria crezca con el tamaño del documento
+        reader.resolved_objects.clear()
+
+
+def _extract_pages(stream, start, stop, page_timeout, on_progress=None):
+    """Extrae las páginas [start, stop) con un presupuesto de `page_timeout` segundos por página.
+
+    El límite usa SIGALRM, así que solo funciona en el hilo principal del
+    proceso. Las páginas que lo superan se devuelven vacías y se informan en
+    `timed_out`.
+    """
+    texts, timed_out = [], []
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    try:
+        reader = _open(stream)
+        for number in range(start, stop):
+            try:
+                signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                try:
+                    text = _page_text(reader, number)
+                finally:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            except PageTimeout:
+                text = ''
+                timed_out.append(number)
+                # La interrupción puede dejar a medias el estado interno del lector
+                reader = _open(stream)
+            texts.append(text)
+            if on_progress:
+                on_progress(len(texts))
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+    return texts, timed_out
+
+
+def _extract_range(source, start, stop, page_timeout):
+    """Extrae las páginas [start, stop) dentro de un proceso del pool"""
+    with _stream(source) as stream:
+        texts, timed_out = _extract_pages(stream, start, stop, page_timeout)
+    return start, texts, timed_out
+
+
+class PdfExtractor:
+    """Extrae el texto de un PDF repartiendo las páginas en un pool de procesos.
+
+    Los documentos con menos de `min_parallel_pages` páginas van al pool en
+    un solo tramo, para que también tengan límite por página. Sin pool
+    (`workers` = 0 o un archivo abierto como origen) se procesan en el hilo
+    actual, con límite por página solo si es el hilo principal.
+
+    `offload(func, *args)`, si se indica, ejecuta la extracción en serie
+    (p. ej. en un hilo del sistema para no bloquear el hub de gevent).
+    """
+
+    def __init__(self, workers, page_timeout, min_parallel_pages=16, offload=None):
+        self.workers = workers
+        self.page_timeout = page_timeout
+        self.min_parallel_pages = min_parallel_pages
+        self.offload = offload
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # 'spawn' evita heredar hilos y locks del worker web al crear procesos
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def extract(self, source, on_progress=None):
+        """Devuelve el texto de cada página, en orden.
+
+        `source` es la ruta del PDF, sus bytes o un archivo abierto en modo
+        binario; la extracción en paralelo necesita la ruta o los bytes, así
+        que con un archivo abierto se hace en serie. `on_progress(hechas, total)`
+        se llama a medida que terminan las páginas.
+        """
+        with _stream(source) as stream:
+            total = len(_open(stream).pages)
+            if on_progress:
+                on_progress(0, total)
+
+            if self.workers <= 0 or not isinstance(source, (str, bytes)):
+                return self._serial(stream, total, on_progress)
+
+        # Dos tramos por proceso equilibran la carga sin copiar el PDF demasiadas veces
+        shard = total if total < self.min_parallel_pages else math.ceil(total / (self.workers * 2))
+        try:
+            return self._extract_parallel(source, total, max(1, shard), on_progress)
+        except BrokenProcessPool:
+            logger.error("El pool de extracción de PDF se cayó; se reintenta en serie")
+            self._reset_pool()
+            with _stream(source) as stream:
+                return self._serial(stream, total, on_progress)
+
+    def _serial(self, stream, total, on_progress):
+        if self.offload:
+            return self.offload(self._extract_serial, stream, total, on_progress)
+        return self._extract_serial(stream, total, on_progress)
+
+    def _extract_serial(self, stream, total, on_progress):
+        if threading.current_thread() is threading.main_thread():
+            progress = (lambda done: on_progress(done, total)) if on_progress else None
+            texts, timed_out = _extract_pages(stream, 0, total, self.page_timeout, progress)
+            if timed_out:
+                logger.warning(f"Páginas sin texto por tiempo excedido: {timed_out}")
+            return texts
+
+        # Fuera del hilo principal no hay SIGALRM: sin límite por página
+        reader = _open(stream)
+        texts = []
+        for number in range(total):
+            texts.append(_page_text(reader, number))
+            if on_progress:
+                on_progress(len(texts), total)
+        return texts
+
+    def _extract_parallel(self, source, total, shard, on_progress):
+        pool = self._get_pool()
+        futures = {
+            pool.submit(_extract_range, source, start, min(start + shard, total), self.page_timeout): start
+            for start in range(0, total, shard)
+        }
+
+        texts = [''] * total
+        done = 0
+        # Margen global: ningún tramo puede tardar más que la suma de sus páginas
+        deadline = self.page_timeout * shard + 5
+        try:
+            rounds = math.ceil(len(futures) / self.workers)
+            for future in concurrent.futures.as_completed(futures, timeout=deadline * rounds):
+                start, shard_texts, timed_out = future.result()
+                texts[start:start + len(shard_texts)] = shard_texts
+                if timed_out:
+                    logger.warning(f"Páginas sin texto por tiempo excedido: {timed_out}")
+                done += len(shard_texts)
+                if on_progress:
+                    on_progress(done, total)
+        except concurrent.futures.TimeoutError:
+            logger.error("La extracción del PDF excedió el tiempo máximo; se devuelven las páginas listas")
+            for future in futures:
+                future.cancel()
+        return texts
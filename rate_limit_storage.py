@@ -0,0 +1,148 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from math import floor
+from urllib.parse import urlparse
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+from sqlite_connection import ProcessConnection
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Contadores de rate limit en un archivo SQLite local compartido por los workers.
+
+    Se registra en `limits` con el esquema `sqlite:///ruta/al/archivo.sqlite3`.
+    Cada comprobación es una única transacción BEGIN IMMEDIATE, de modo que
+    leer y sumar el contador es atómico entre procesos sin salto de red.
+    Soporta las estrategias fixed-window y sliding-window-counter.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Escrituras por conexión entre limpiezas de contadores vencidos
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        self.path = urlparse(uri).path
+        # Modo autocommit: las transacciones se abren a mano
+        self._db = ProcessConnection(self.path, timeout=5, isolation_level=None)
+        self._writes = 0
+
+        with self._db.acquire() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                "key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires REAL NOT NULL)"
+            )
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @contextmanager
+    def _transaction(self):
+        with self._db.acquire() as conn:
+            # IMMEDIATE toma el bloqueo de escritura al empezar: nadie cuela un hit entre la lectura y la suma
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _counts(self, conn, keys, now):
+        placeholders = ', '.join('?' * len(keys))
+        rows = conn.execute(
+            f"SELECT key, value FROM counters WHERE key IN ({placeholders}) AND expires > ?",
+            (*keys, now)
+        ).fetchall()
+        return dict(rows)
+
+    def _incr(self, conn, key, expiry, amount, now):
+        value, = conn.execute(
+            "INSERT INTO counters (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = CASE WHEN expires > ? THEN value + excluded.value ELSE excluded.value END, "
+            "expires = CASE WHEN expires > ? THEN expires ELSE excluded.expires END "
+            "RETURNING value",
+            (key, amount, now + expiry, now, now)
+        ).fetchone()
+
+        self._writes += 1
+        if self._writes % self.PURGE_INTERVAL == 0:
+            conn.execute("DELETE FROM counters WHERE expires <= ?", (now,))
+        return value
+
+    def incr(self, key, expiry, amount=1):
+        with self._transaction() as conn:
+            return self._incr(conn, key, expiry, amount, time.time())
+
+    def get(self, key):
+        with self._db.acquire() as conn:
+            return self._counts(conn, (key,), time.time()).get(key, 0)
+
+    def get_expiry(self, key):
+        now = time.time()
+        with self._db.acquire() as conn:
+            row = conn.execute(
+                "SELECT expires FROM counters WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+        return row[0] if row is not None else now
+
+    def check(self):
+        try:
+            with self._db.acquire() as conn:
+                conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._db.acquire() as conn:
+            return conn.execute("DELETE FROM counters").rowcount
+
+    def clear(self, key):
+        with self._db.acquire() as conn:
+            conn.execute("DELETE FROM counters WHERE key = ?", (key,))
+
+    def _sliding_window_info(self, counts, previous_key, current_key, expiry, now):
+        previous_count = counts.get(previous_key, 0)
+        current_count = counts.get(current_key, 0)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self._transaction() as conn:
+            counts = self._counts(conn, (previous_key, current_key), now)
+            previous_count, previous_ttl, current_count, _ = self._sliding_window_info(
+                counts, previous_key, current_key, expiry, now
+            )
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            if floor(weighted_count) + amount > limit:
+                return False
+            # La ventana actual sirve de "anterior" durante el siguiente periodo
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self._db.acquire() as conn:
+            counts = self._counts(conn, (previous_key, current_key), now)
+        return self._sliding_window_info(counts, previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        with self._db.acquire() as conn:
+            conn.execute("DELETE FROM counters WHERE key IN (?, ?)", (previous_key, current_key))
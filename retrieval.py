@@ -0,0 +1,139 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# Palabras vacías frecuentes en español e inglés; no aportan a la relevancia
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales
+cuando de del desde donde dos el ella ellas ellos en entre era eran es esa esas ese eso
+esos esta estan estas este esto estos fue fueron ha han hasta hay la las le les lo los
+mas me mi mientras muy no nos o otra otras otro otros para pero poco por porque que
+quien se sea segun ser si sin sobre son su sus tambien tan te tiene tienen todo todos
+tu un una unas uno unos y ya
+an and are as at be by for from has have in into is it its of on or that the their
+this to was were which with
+""".split())
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Normaliza (minúsculas, sin tildes) y separa el texto en términos"""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+    return [t for t in TOKEN_PATTERN.findall(normalized)
+            if len(t) > 1 and t not in STOPWORDS]
+
+
+SENTENCE_END = re.compile(r'[.!?…:;]["»”)]?\s')
+
+
+def _cut_position(text, start, max_chars):
+    """Dónde cortar un párrafo demasiado largo: tras el último fin de frase de
+    la segunda mitad del límite, si no en el último espacio, si no en el límite"""
+    limit = start + max_chars
+    sentence = None
+    for match in SENTENCE_END.finditer(text, start + max_chars // 2, limit):
+        sentence = match.end() - 1
+    if sentence is not None:
+        return sentence
+    cut = max(text.rfind(' ', start, limit), text.rfind('\n', start, limit))
+    return cut if cut > start else limit
+
+
+def paragraph_spans(text, max_chars):
+    """Divide el texto en párrafos (inicio, fin) separados por líneas en blanco,
+    cortando los de más de `max_chars` caracteres"""
+    boundaries = [m.span() for m in re.finditer(r'\n\s*\n', text)]
+    boundaries.append((len(text), len(text)))
+
+    paragraphs = []
+    position = 0
+    for sep_start, sep_end in boundaries:
+        start, end = position, sep_start
+        position = sep_end
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        while end - start > max_chars:
+            cut = _cut_position(text, start, max_chars)
+            paragraphs.append((start, cut))
+            start = cut
+            while start < end and text[start].isspace():
+                start += 1
+        if start < end:
+            paragraphs.append((start, end))
+    return paragraphs
+
+
+def chunk_spans(text, max_chars=1500):
+    """Divide el texto en fragmentos (inicio, fin) agrupando párrafos consecutivos.
+
+    Los párrafos cortos se agrupan hasta `max_chars`; los largos se cortan en
+    el último fin de frase o espacio antes del límite.
+    """
+    spans = []
+    for start, end in paragraph_spans(text, max_chars):
+        if spans and end - spans[-1][0] <= max_chars:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+class BM25Index:
+    """Índice BM25 sobre los fragmentos de un documento, vectorizado con NumPy"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        postings = {}
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for i, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            lengths[i] = len(terms)
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(count)
+
+        n = len(chunks)
+        avg_length = float(lengths.mean()) if n and lengths.sum() else 1.0
+        self._norm = k1 * (1 - b + b * lengths / avg_length)
+        self._postings = {}
+        for term, (ids, counts) in postings.items():
+            df = len(ids)
+            idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+            self._postings[term] = (np.array(ids, dtype=np.int32),
+                                    np.array(counts, dtype=np.float32),
+                                    np.float32(idf))
+
+    def scores(self, query):
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, tf, idf = posting
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + self._norm[ids])
+        return scores
+
+    def top_k(self, query, k):
+        """Índices de los k fragmentos más relevantes, en orden de aparición"""
+        if not self.chunks:
+            return []
+        scores = self.scores(query)
+        k = min(k, len(self.chunks))
+        if not scores.any():
+            # Sin términos en común: el inicio del documento suele dar contexto
+            return list(range(k))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[scores[best] > 0]
+        return sorted(int(i) for i in best)
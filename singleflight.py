@@ -0,0 +1,114 @@
+import fcntl
+import os
+import threading
+import time
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Agrupa llamadas idénticas simultáneas para que solo una llegue al servicio externo.
+
+    Dentro de un proceso los seguidores esperan al hilo líder. Entre procesos,
+    el líder toma un flock por clave y publica el resultado en `store` (un
+    SQLiteCache de TTL corto) donde lo recogen los demás workers.
+    """
+
+    def __init__(self, lock_dir, store, wait_timeout, poll_interval=0.05):
+        self.lock_dir = lock_dir
+        self.store = store
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'issued': 0, 'coalesced': 0}
+
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key, func):
+        """Devuelve func() o el resultado de la llamada en curso con la misma clave.
+
+        El resultado debe ser serializable a JSON.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            self._count('coalesced')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, func)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def forget(self, key):
+        """Descarta el resultado publicado de `key` para que la próxima llamada se repita"""
+        self.store.delete(key)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _do_shared(self, key, func):
+        path = os.path.join(self.lock_dir, f"{key}.lock")
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            # Sondeo sin bloquear: con gevent un flock bloqueante detendría todo el worker
+            deadline = time.monotonic() + self.wait_timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    shared = self.store.get(key)
+                    if shared is not None:
+                        self._count('coalesced')
+                        return shared['value']
+                    if time.monotonic() > deadline:
+                        # El líder de otro worker tarda demasiado: llamar por cuenta propia
+                        return self._issue(key, func)
+                    time.sleep(self.poll_interval)
+
+            shared = self.store.get(key)
+            if shared is not None:
+                self._count('coalesced')
+                return shared['value']
+
+            value = self._issue(key, func)
+            # Los que esperan sobre el archivo desvinculado encontrarán el resultado publicado
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return value
+        finally:
+            os.close(fd)  # Cerrar el descriptor libera el flock
+
+    def _issue(self, key, func):
+        self._count('issued')
+        value = func()
+        self.store.set(key, {"value": value})
+        return value
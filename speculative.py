@@ -0,0 +1,112 @@
+import logging
+import queue
+
+from workers import WorkerQueue
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeQueue(WorkerQueue):
+    """Cola acotada para trabajo especulativo: resultados que probablemente se pedirán.
+
+    El resultado de cada clave se guarda en `store` (un SQLiteCache) para que
+    lo sirva cualquier worker. Como el trabajo es opcional, si la cola está
+    llena se descarta en vez de esperar. Varias sesiones pueden esperar la
+    misma clave (el mismo documento subido por varios usuarios): cada una se
+    registra con su testigo y `cancel` solo marca la clave cuando ya no queda
+    ninguna; el trabajo se salta si aún no ha empezado, pero una llamada ya
+    en curso a Gemini no se puede interrumpir.
+    """
+
+    thread_name = 'speculative-worker'
+
+    def __init__(self, store, workers, max_pending, on_event=None):
+        super().__init__(workers, max_pending)
+        self.store = store
+        self.on_event = on_event
+        self._counters = {'queued': 0, 'dropped': 0, 'completed': 0, 'cancelled': 0, 'failed': 0}
+
+    def submit(self, key, func, watcher):
+        """Registra a `watcher` como interesado en `key` y encola `func()` si nadie lo
+        había hecho. Devuelve False si no queda nada que esperar (ya está calculado
+        o la cola está llena)"""
+        enqueue = False
+
+        def watch(entry):
+            nonlocal enqueue
+            if entry is not None and entry['status'] in ('queued', 'running'):
+                return dict(entry, watchers=entry['watchers'] + [watcher])
+            if entry is not None and entry['status'] == 'done':
+                return entry
+            enqueue = True
+            return {"status": "queued", "watchers": [watcher]}
+
+        entry = self.store.update(key, watch)
+        if not enqueue:
+            return entry['status'] != 'done'
+        try:
+            self._put((key, func))
+        except queue.Full:
+            self.store.delete(key)
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def cancel(self, key, watcher):
+        """Retira a `watcher`; si era el último interesado, descarta el trabajo pendiente"""
+        def release(entry):
+            if entry is None or watcher not in entry.get('watchers', ()):
+                return entry
+            watchers = [w for w in entry['watchers'] if w != watcher]
+            return dict(entry, watchers=watchers) if watchers else {"status": "cancelled"}
+
+        self.store.update(key, release)
+
+    def status(self, key):
+        entry = self.store.get(key)
+        return entry['status'] if entry else None
+
+    def result(self, key):
+        """Resultado ya calculado para `key` o None"""
+        entry = self.store.get(key)
+        return entry['result'] if entry and entry['status'] == 'done' else None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, event):
+        with self._lock:
+            self._counters[event] += 1
+        if self.on_event:
+            self.on_event(event)
+
+    def _execute(self, key, func):
+        def start(entry):
+            return dict(entry, status='running') if entry and entry['status'] == 'queued' else entry
+
+        entry = self.store.update(key, start)
+        if entry is None or entry['status'] != 'running':
+            self._count('cancelled')
+            return
+
+        try:
+            result = func()
+        except Exception as e:
+            logger.warning(f"Trabajo especulativo {key} falló: {str(e)}")
+            self.store.delete(key)
+            self._count('failed')
+            return
+
+        # Si se canceló mientras se calculaba, el resultado ya no interesa
+        def finish(entry):
+            if entry and entry['status'] == 'running':
+                return {"status": "done", "result": result}
+            return entry
+
+        entry = self.store.update(key, finish)
+        if entry is None or entry['status'] != 'done':
+            self._count('cancelled')
+            return
+        self._count('completed')
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+
+from sqlite_connection import ProcessConnection
+
+
+class SQLiteCache:
+    """Almacén clave-valor en SQLite compartido por todos los workers del servidor.
+
+    Los valores se guardan como JSON. Las entradas caducan `ttl` segundos
+    después de escribirse y, al superar `max_entries`, se expulsan las
+    menos usadas recientemente.
+    """
+
+    def __init__(self, path, table, ttl, max_entries):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._db = ProcessConnection(path, timeout=10)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0}
+
+        with self._db.acquire() as conn, conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+
+    def get(self, key):
+        now = time.time()
+        with self._db.acquire() as conn, conn:
+            row = conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND created > ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row is not None:
+                conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            self._counters['hits' if row is not None else 'misses'] += 1
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key, value):
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)  # fuera del bloqueo de la conexión
+        with self._db.acquire() as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, data, now, now)
+            )
+            conn.execute(f"DELETE FROM {self.table} WHERE created <= ?", (now - self.ttl,))
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def update(self, key, func):
+        """Sustituye el valor de `key` por `func(valor o None)` de forma atómica entre
+        workers y lo devuelve; si `func` devuelve None se borra la entrada"""
+        now = time.time()
+        with self._db.acquire() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND created > ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            value = func(json.loads(row[0]) if row is not None else None)
+            if value is None:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            data = json.dumps(value, ensure_ascii=False)
+            if row is None or data != row[0]:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, data, now, now)
+                )
+        return value
+
+    def delete(self, key):
+        with self._db.acquire() as conn, conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ProcessConnection:
+    """Una conexión SQLite en modo WAL por proceso, compartida por sus hilos bajo un lock.
+
+    Una conexión por hilo sería una por solicitud con gevent (cada greenlet
+    tiene su threading.local), y abrirla con sus PRAGMA cuesta varias veces
+    lo que una consulta. Si el proceso se bifurca, el hijo abre la suya en
+    vez de reutilizar la heredada. `connect_args` se pasan a sqlite3.connect.
+    """
+
+    def __init__(self, path, **connect_args):
+        self.path = path
+        self.connect_args = connect_args
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    @contextmanager
+    def acquire(self):
+        """La conexión del proceso, en exclusiva mientras dura el bloque"""
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(self.path, check_same_thread=False, **self.connect_args)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._pid = os.getpid()
+            yield self._conn
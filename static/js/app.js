@@ -1,6 +1,6 @@
 // static/js/app.js
-import { setupEventListeners, renderParagraphs } from './modules/uiManager.js';
-import { handleFileUpload, getFullDocumentText, setFullDocumentText } from './modules/fileHandler.js';
+import { setupEventListeners } from './modules/uiManager.js';
+import { handleFileUpload, getFullDocumentText, setFullDocumentText, cancelDocumentWork } from './modules/fileHandler.js';
 import { handleUserQuestion, addMessageToChat, getChatHistory } from './modules/chatManager.js';
 import { fetchComplement, generateSuggestions } from './modules/textProcessor.js';
 import {
@@ -29,6 +29,9 @@ window.generateSuggestions = generateSuggestions;
 document.addEventListener('DOMContentLoaded', () => {
     setupEventListeners();
 
+    // Al salir, el servidor deja de precalcular para este documento
+    window.addEventListener('pagehide', cancelDocumentWork);
+
     // Mensaje inicial del asistente
     setTimeout(() => {
         addMessageToChat("¡Hola! Soy tu asistente para analizar documentos. Sube un archivo y hazme preguntas sobre su contenido.");
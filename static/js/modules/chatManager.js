@@ -1,6 +1,6 @@
 // static/js/modules/chatManager.js
-import { sanitizeInput, showLoading, hideLoading } from './utils.js';
-import { getFullDocumentText } from './fileHandler.js';
+import { sanitizeInput, showLoading, hideLoading, readEventStream } from './utils.js';
+import { getFullDocumentText, fetchWithDocument } from './fileHandler.js';
 
 let chatHistory = [];
 let isTyping = false;
@@ -65,16 +65,11 @@ export async function handleUserQuestion(question) {
     showTypingIndicator();
 
     try {
-        const response = await fetch('/chat', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                question: question,
-                document_text: documentText
-            })
-        });
+        const streaming = typeof ReadableStream !== 'undefined' && typeof TextDecoder !== 'undefined';
+        const response = await fetchWithDocument(streaming ? '/chat/stream' : '/chat', { question: question });
 
         if (!response.ok) {
+            hideTypingIndicator();
             const errorData = await response.json();
             if (errorData.error === "rate_limit_exceeded") {
                 showChatError(errorData.message);
@@ -84,6 +79,11 @@ export async function handleUserQuestion(question) {
             return;
         }
 
+        if (streaming) {
+            await readAnswerStream(response);
+            return;
+        }
+
         const data = await response.json();
         hideTypingIndicator();
         addMessageToChat(data.answer);
@@ -95,6 +95,35 @@ export async function handleUserQuestion(question) {
     }
 }
 
+// Lee la respuesta SSE de /chat/stream mostrando el texto a medida que llega
+async function readAnswerStream(response) {
+    const chatMessages = document.getElementById('chatMessages');
+    let partialDiv = null;
+
+    await readEventStream(response, (event, data) => {
+        if (event === 'token') {
+            if (!partialDiv) {
+                hideTypingIndicator();
+                partialDiv = document.createElement('div');
+                partialDiv.className = 'message bot-message';
+                chatMessages.appendChild(partialDiv);
+            }
+            partialDiv.textContent += data.text;
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        } else if (event === 'done') {
+            // Reemplazar el texto parcial por el mensaje con formato completo
+            if (partialDiv) partialDiv.remove();
+            hideTypingIndicator();
+            addMessageToChat(data.answer);
+        } else if (event === 'error') {
+            if (partialDiv) partialDiv.remove();
+            hideTypingIndicator();
+            showChatError(`Error: ${data.error}`);
+        }
+    });
+    hideTypingIndicator();
+}
+
 function showTypingIndicator() {
     if (isTyping) return;
 
@@ -0,0 +1,181 @@
+// static/js/modules/documentView.js
+import { fetchParagraphs, setFullDocumentText } from './fileHandler.js';
+import { fetchComplement } from './textProcessor.js';
+import { handleParagraphClick } from './voiceManager.js';
+import { showError } from './utils.js';
+
+// Lectura virtual: el documento se divide en bloques de `page_size` párrafos.
+// Solo los bloques cercanos a la vista tienen párrafos en el DOM; el resto son
+// marcadores vacíos con la altura medida (o estimada) del bloque. Las páginas
+// se piden al servidor al acercarse a la vista y se guardan en un LRU acotado.
+const ESTIMATED_PARAGRAPH_HEIGHT = 140;
+const RENDER_MARGIN = '1200px 0px';
+const MAX_CACHED_PAGES = 8;
+
+let view = null;
+
+export function renderDocument(result) {
+    const contentDiv = document.getElementById('content');
+    if (!contentDiv) return;
+
+    if (view) view.observer.disconnect();
+    contentDiv.innerHTML = '';
+
+    const pageSize = result.page_size || result.paragraphs.length || 1;
+    const pageCount = Math.ceil(result.total_paragraphs / pageSize);
+    view = {
+        documentId: result.document_id,
+        total: result.total_paragraphs,
+        pageSize: pageSize,
+        pages: new Map([[0, result.paragraphs.map(p => p.text)]]),  // página -> textos (LRU)
+        loading: new Map(),  // página -> promesa en curso
+        rendered: new Set(),
+        complements: new Map(),  // índice -> HTML del complemento de bloques ya descartados
+        blocks: [],
+        observer: new IntersectionObserver(onIntersection, {
+            root: document.getElementById('documentContent'),
+            rootMargin: RENDER_MARGIN
+        })
+    };
+
+    // Respaldo por si la sesión expira: solo el texto ya descargado
+    setFullDocumentText(view.pages.get(0).join('\n\n'));
+
+    for (let page = 0; page < pageCount; page++) {
+        const block = document.createElement('div');
+        block.className = 'paragraph-block';
+        block.dataset.page = page;
+        block.style.height = `${pageLength(page) * ESTIMATED_PARAGRAPH_HEIGHT}px`;
+        view.blocks.push(block);
+        contentDiv.appendChild(block);
+        view.observer.observe(block);
+    }
+
+    const complementAllButton = document.getElementById('complementAll');
+    if (complementAllButton) complementAllButton.disabled = view.total === 0;
+}
+
+// Párrafos presentes en el DOM: [{ index, text, element }]
+export function getRenderedParagraphs() {
+    return Array.from(document.querySelectorAll('#content .paragraph')).map(paraDiv => ({
+        index: Number(paraDiv.dataset.index),
+        text: paraDiv.querySelector('.original-text').textContent,
+        element: paraDiv.querySelector('.ai-response')
+    }));
+}
+
+function pageLength(page) {
+    return Math.min(view.pageSize, view.total - page * view.pageSize);
+}
+
+function onIntersection(entries) {
+    entries.forEach(entry => {
+        const page = Number(entry.target.dataset.page);
+        if (entry.isIntersecting) {
+            showPage(page);
+        } else {
+            hidePage(page);
+        }
+    });
+}
+
+async function loadPage(page) {
+    if (view.pages.has(page)) {
+        const texts = view.pages.get(page);
+        view.pages.delete(page);
+        view.pages.set(page, texts);
+        return texts;
+    }
+    if (!view.loading.has(page)) {
+        const current = view;
+        const request = fetchParagraphs(page * view.pageSize, view.pageSize).then(texts => {
+            current.pages.set(page, texts);
+            while (current.pages.size > MAX_CACHED_PAGES) {
+                current.pages.delete(current.pages.keys().next().value);
+            }
+            return texts;
+        }).finally(() => current.loading.delete(page));
+        view.loading.set(page, request);
+    }
+    return view.loading.get(page);
+}
+
+async function showPage(page) {
+    if (view.rendered.has(page)) return;
+    const current = view;
+    const block = view.blocks[page];
+
+    let texts;
+    try {
+        texts = await loadPage(page);
+    } catch (error) {
+        showError(error);
+        return;
+    }
+    // Otro documento, o el bloque salió de la vista mientras se descargaba
+    if (current !== view || view.rendered.has(page) || !isNear(block)) return;
+
+    const fragment = document.createDocumentFragment();
+    texts.forEach((text, offset) => {
+        if (text) fragment.appendChild(createParagraph(text, page * view.pageSize + offset));
+    });
+    block.replaceChildren(fragment);
+    block.style.height = '';
+    view.rendered.add(page);
+}
+
+function hidePage(page) {
+    if (!view.rendered.has(page)) return;
+    const block = view.blocks[page];
+
+    block.querySelectorAll('.paragraph').forEach(paraDiv => {
+        const aiResponse = paraDiv.querySelector('.ai-response');
+        if (aiResponse.innerHTML.trim()) {
+            view.complements.set(Number(paraDiv.dataset.index), aiResponse.innerHTML);
+        }
+    });
+
+    // Conservar la altura real para que la barra de desplazamiento no salte
+    block.style.height = `${block.offsetHeight}px`;
+    block.replaceChildren();
+    view.rendered.delete(page);
+}
+
+function isNear(block) {
+    const root = document.getElementById('documentContent');
+    const area = root.getBoundingClientRect();
+    const rect = block.getBoundingClientRect();
+    const margin = parseInt(RENDER_MARGIN, 10);
+    return rect.bottom >= area.top - margin && rect.top <= area.bottom + margin;
+}
+
+function createParagraph(text, index) {
+    const paraDiv = document.createElement('div');
+    paraDiv.className = 'paragraph';
+    paraDiv.dataset.index = index;
+    paraDiv.innerHTML = `
+        <div class="original-text">${text}</div>
+        <button class="ai-trigger-button">Obtener información complementaria ⚡</button>
+        <div class="ai-response" id="ai-${index}"></div>
+    `;
+
+    const aiResponse = paraDiv.querySelector('.ai-response');
+    const button = paraDiv.querySelector('.ai-trigger-button');
+    const textElement = paraDiv.querySelector('.original-text');
+
+    if (view.complements.has(index)) {
+        aiResponse.innerHTML = view.complements.get(index);
+        aiResponse.style.display = 'block';
+    }
+
+    button.addEventListener('click', (e) => {
+        e.stopPropagation();
+        fetchComplement(text, aiResponse, index);
+    });
+
+    textElement.addEventListener('click', () => {
+        handleParagraphClick(paraDiv, text);
+    });
+
+    return paraDiv;
+}
@@ -2,6 +2,8 @@
 import { showLoading, hideLoading, showError } from './utils.js';
 
 let fullDocumentText = '';
+let documentId = null;
+let uploadToken = null;  // identifica esta subida al cancelar su trabajo especulativo
 
 export function getFullDocumentText() {
     return fullDocumentText;
@@ -11,14 +13,69 @@ export function setFullDocumentText(text) {
     fullDocumentText = text;
 }
 
+export function getDocumentId() {
+    return documentId;
+}
+
+export function setDocumentId(id) {
+    documentId = id;
+}
+
+// Envía la solicitud referenciando el documento por id; si la sesión
+// expiró en el servidor, reintenta una vez con el texto completo.
+export async function fetchWithDocument(url, body) {
+    const send = (payload) => fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    });
+
+    if (documentId) {
+        const response = await send({ ...body, document_id: documentId });
+        if (response.status !== 404) {
+            return response;
+        }
+        documentId = null;
+    }
+
+    return send({ ...body, document_text: fullDocumentText });
+}
+
+// Párrafos [offset, offset + limit) del documento actual (respuesta comprimida con gzip)
+export async function fetchParagraphs(offset, limit) {
+    const response = await fetch(`/documents/${documentId}/paragraphs?offset=${offset}&limit=${limit}`);
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.message || error.error || 'Error al cargar el documento');
+    }
+    const data = await response.json();
+    return data.paragraphs.map(p => p.text);
+}
+
+// Avisa al servidor de que el documento actual ya no se usa para que descarte
+// el trabajo especulativo pendiente (sugerencias precalculadas) si nadie más
+// subió el mismo archivo. sendBeacon sigue funcionando mientras la página se cierra.
+export function cancelDocumentWork() {
+    if (!documentId || !uploadToken || !navigator.sendBeacon) return;
+    const body = JSON.stringify({ upload_token: uploadToken });
+    navigator.sendBeacon(`/documents/${documentId}/cancel`, new Blob([body], { type: 'application/json' }));
+    uploadToken = null;
+}
+
+// Archivos a partir de este tamaño se procesan en segundo plano con seguimiento
+const ASYNC_UPLOAD_THRESHOLD = 2 * 1024 * 1024;
+const JOB_POLL_INTERVAL = 1500;
+
 export async function handleFileUpload(file) {
     showLoading('Procesando documento...');
+    cancelDocumentWork();
 
     try {
         const formData = new FormData();
         formData.append('file', file);
 
-        const response = await fetch('/process', {
+        const useJob = file.size >= ASYNC_UPLOAD_THRESHOLD;
+        const response = await fetch(useJob ? '/process?async=1' : '/process', {
             method: 'POST',
             body: formData
         });
@@ -28,7 +85,13 @@ export async function handleFileUpload(file) {
             throw new Error(error.error || 'Error al procesar el archivo');
         }
 
-        const result = await response.json();
+        let result = await response.json();
+        if (useJob) {
+            result = await waitForJob(result.job_id);
+        }
+
+        setDocumentId(result.document_id);
+        uploadToken = result.upload_token || null;
         return result;
 
     } catch (error) {
@@ -38,4 +101,27 @@ export async function handleFileUpload(file) {
     } finally {
         hideLoading();
     }
-}
\ No newline at end of file
+}
+
+async function waitForJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+
+        const response = await fetch(`/process/jobs/${jobId}`);
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Error al procesar el archivo');
+        }
+
+        const job = await response.json();
+        if (job.status === 'done') {
+            return job.result;
+        }
+        if (job.status === 'error') {
+            throw new Error(job.error || 'Error al procesar el archivo');
+        }
+        if (job.pages_total > 0) {
+            showLoading(`Procesando documento... página ${job.pages_done} de ${job.pages_total}`);
+        }
+    }
+}
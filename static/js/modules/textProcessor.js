@@ -1,8 +1,17 @@
 // static/js/modules/textProcessor.js
-import { getFullDocumentText, setFullDocumentText } from './fileHandler.js';
-import { showLoading, hideLoading } from './utils.js';
-
-export async function fetchComplement(text, aiResponseElement) {
+import { getFullDocumentText, setFullDocumentText, getDocumentId, fetchWithDocument } from './fileHandler.js';
+import { showLoading, hideLoading, readEventStream } from './utils.js';
+
+// Mismas reglas que pack_complement_items (app.py): cada lote enviado a
+// /complement/batch debe caber en las consultas por minuto de los complementos
+const COMPLEMENT_MAX_PROMPTS = 5;
+const COMPLEMENT_PACK_THRESHOLD = 600;
+const COMPLEMENT_PACK_MAX_CHARS = 2400;
+const COMPLEMENT_PACK_MAX_ITEMS = 4;
+// Reintentos de un lote rechazado por el rate limit, esperando lo que indique Retry-After
+const COMPLEMENT_MAX_RETRIES = 3;
+
+export async function fetchComplement(text, aiResponseElement, paragraphIndex = null) {
     if (!text || text.trim().length < 10) {
         aiResponseElement.innerHTML = '<div class="error">Texto demasiado corto para complementar</div>';
         aiResponseElement.style.display = 'block';
@@ -13,21 +22,45 @@ export async function fetchComplement(text, aiResponseElement) {
     aiResponseElement.style.display = 'block';
 
     try {
-        const response = await fetch('/complement', {
+        // Con sesión activa basta con el índice del párrafo
+        const payload = getDocumentId() && paragraphIndex !== null
+            ? { document_id: getDocumentId(), paragraph: paragraphIndex }
+            : { text: text };
+
+        const postComplement = (body) => fetch('/complement', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ text: text })
+            body: JSON.stringify(body)
         });
 
+        let response = await postComplement(payload);
+        if (response.status === 404 && payload.document_id) {
+            // La sesión expiró: reenviar el texto del párrafo
+            response = await postComplement({ text: text });
+        }
+
         if (!response.ok) {
             throw new Error(`Error ${response.status}: ${await response.text()}`);
         }
 
         const data = await response.json();
+        renderComplement(aiResponseElement, data);
 
+    } catch (error) {
+        console.error('Error al complementar:', error);
         aiResponseElement.innerHTML = `
+            <div class="error">
+                <i class="fas fa-exclamation-triangle"></i> Error al obtener información: ${error.message}
+            </div>
+        `;
+    }
+}
+
+function renderComplement(aiResponseElement, data) {
+    aiResponseElement.style.display = 'block';
+    aiResponseElement.innerHTML = `
             <div class="ai-complement">
                 <h4>Información complementaria:</h4>
                 <div class="complement-content">${data.complement.replace(/\n/g, '<br>')}</div>
@@ -43,14 +76,102 @@ export async function fetchComplement(text, aiResponseElement) {
                 ` : ''}
             </div>
         `;
+}
 
-    } catch (error) {
-        console.error('Error al complementar:', error);
-        aiResponseElement.innerHTML = `
-            <div class="error">
-                <i class="fas fa-exclamation-triangle"></i> Error al obtener información: ${error.message}
-            </div>
-        `;
+// Divide los párrafos en lotes que el servidor empaqueta en COMPLEMENT_MAX_PROMPTS prompts o menos
+function splitComplementBatches(items) {
+    const batches = [];
+    let batch = [], prompts = 0, packItems = 0, packChars = 0;
+    items.forEach(item => {
+        const size = item.text.trim().length;
+        const joinsPack = size < COMPLEMENT_PACK_THRESHOLD && packItems > 0 &&
+            packChars + size <= COMPLEMENT_PACK_MAX_CHARS && packItems < COMPLEMENT_PACK_MAX_ITEMS;
+        if (!joinsPack && prompts === COMPLEMENT_MAX_PROMPTS) {
+            batches.push(batch);
+            batch = [];
+            prompts = packItems = packChars = 0;
+        }
+        batch.push(item);
+        if (size >= COMPLEMENT_PACK_THRESHOLD) {
+            prompts++;  // Los párrafos largos van solos y no cierran el paquete abierto
+        } else if (packItems > 0 && packChars + size <= COMPLEMENT_PACK_MAX_CHARS &&
+                   packItems < COMPLEMENT_PACK_MAX_ITEMS) {
+            packItems++;
+            packChars += size;
+        } else {
+            prompts++;
+            packItems = 1;
+            packChars = size;
+        }
+    });
+    if (batch.length) batches.push(batch);
+    return batches;
+}
+
+// Complementa varios párrafos a la vez; cada resultado se muestra al llegar.
+// items: [{ index, text, element }]
+export async function fetchComplementBatch(items) {
+    const documentId = getDocumentId();
+    const byId = new Map();
+
+    for (const batch of splitComplementBatches(items)) {
+        byId.clear();
+        batch.forEach((item, position) => {
+            byId.set(documentId ? item.index : position, item.element);
+            item.element.innerHTML = '<div class="loading"><i class="fas fa-spinner fa-spin"></i> Analizando texto...</div>';
+            item.element.style.display = 'block';
+        });
+
+        const payload = documentId
+            ? { document_id: documentId, paragraphs: batch.map(item => item.index) }
+            : { texts: batch.map(item => item.text) };
+
+        try {
+            let response;
+            for (let attempt = 0; ; attempt++) {
+                response = await fetch('/complement/batch', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(payload)
+                });
+                if (response.status !== 429 || attempt >= COMPLEMENT_MAX_RETRIES) break;
+
+                // Presupuesto de consultas agotado: esperar a que se libere la ventana
+                const wait = Number(response.headers.get('Retry-After')) || 60;
+                batch.forEach(item => {
+                    item.element.innerHTML = `<div class="loading"><i class="fas fa-hourglass-half"></i> En espera por el límite de consultas (${wait} s)...</div>`;
+                });
+                await new Promise(resolve => setTimeout(resolve, wait * 1000));
+                batch.forEach(item => {
+                    item.element.innerHTML = '<div class="loading"><i class="fas fa-spinner fa-spin"></i> Analizando texto...</div>';
+                });
+            }
+
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.message || errorData.error || `Error ${response.status}`);
+            }
+
+            await readEventStream(response, (event, data) => {
+                const element = byId.get(data.id);
+                if (!element) return;
+                if (event === 'paragraph') {
+                    renderComplement(element, data);
+                } else if (event === 'error') {
+                    element.innerHTML = `<div class="error"><i class="fas fa-exclamation-triangle"></i> ${data.error}</div>`;
+                }
+            });
+        } catch (error) {
+            console.error('Error al complementar en lote:', error);
+            batch.forEach(item => {
+                item.element.innerHTML = `
+                    <div class="error">
+                        <i class="fas fa-exclamation-triangle"></i> Error al obtener información: ${error.message}
+                    </div>
+                `;
+            });
+            return;
+        }
     }
 }
 
@@ -64,11 +185,7 @@ export async function generateSuggestions() {
     showLoading('Generando sugerencias...', document.getElementById('chatStatus'));
 
     try {
-        const response = await fetch('/suggestions', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ document_text: documentText })
-        });
+        const response = await fetchWithDocument('/suggestions', {});
 
         if (!response.ok) {
             throw new Error('Error al generar sugerencias');
@@ -1,5 +1,6 @@
 // static/js/modules/uiManager.js
-import { generateSuggestions } from './textProcessor.js';
+import { generateSuggestions, fetchComplementBatch } from './textProcessor.js';
+import { renderDocument, getRenderedParagraphs } from './documentView.js';
 
 export function setupEventListeners() {
     const toggleButton = document.getElementById('toggleDocument');
@@ -8,6 +9,7 @@ export function setupEventListeners() {
     const sendButton = document.getElementById('sendQuestion');
     const userQuestionInput = document.getElementById('userQuestion');
     const downloadChatButton = document.getElementById('downloadChat');
+    const complementAllButton = document.getElementById('complementAll');
 
     // Toggle document section
     let isCollapsed = false;
@@ -50,7 +52,7 @@ export function setupEventListeners() {
 
             try {
                 const result = await handleFileUpload(file);
-                renderParagraphs(result);
+                renderDocument(result);
                 generateSuggestions();
             } catch (error) {
                 console.error('Error al procesar archivo:', error);
@@ -79,51 +81,27 @@ export function setupEventListeners() {
         });
     }
 
+    // Complementar en lotes los párrafos cargados en el lector
+    if (complementAllButton) {
+        complementAllButton.addEventListener('click', async () => {
+            const items = getRenderedParagraphs().filter(item => item.text.trim().length >= 10);
+            if (items.length === 0) return;
+
+            complementAllButton.disabled = true;
+            try {
+                await fetchComplementBatch(items);
+            } finally {
+                complementAllButton.disabled = false;
+            }
+        });
+    }
+
     // Download chat
     if (downloadChatButton) {
         downloadChatButton.addEventListener('click', downloadChat);
     }
 }
 
-export function renderParagraphs(paragraphs) {
-    const contentDiv = document.getElementById('content');
-    if (!contentDiv) return;
-
-    contentDiv.innerHTML = '';
-    const texts = Array.isArray(paragraphs) ?
-        paragraphs.map(p => p.text || p) :
-        [paragraphs];
-
-    setFullDocumentText(texts.join('\n\n'));
-
-    texts.forEach((text, index) => {
-        if (!text) return;
-
-        const paraDiv = document.createElement('div');
-        paraDiv.className = 'paragraph';
-        paraDiv.innerHTML = `
-            <div class="original-text">${text}</div>
-            <button class="ai-trigger-button">Obtener información complementaria ⚡</button>
-            <div class="ai-response" id="ai-${index}"></div>
-        `;
-
-        const aiResponse = paraDiv.querySelector('.ai-response');
-        const button = paraDiv.querySelector('.ai-trigger-button');
-        const textElement = paraDiv.querySelector('.original-text');
-
-        button.addEventListener('click', (e) => {
-            e.stopPropagation();
-            fetchComplement(text, aiResponse);
-        });
-
-        textElement.addEventListener('click', () => {
-            handleParagraphClick(paraDiv, text);
-        });
-
-        contentDiv.appendChild(paraDiv);
-    });
-}
-
 function downloadChat() {
     const chatHistory = getChatHistory();
     if (chatHistory.length === 0) return;
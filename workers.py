@@ -0,0 +1,42 @@
+import queue
+import threading
+
+
+class WorkerQueue:
+    """Cola acotada atendida por hilos locales del worker, que arrancan con el primer trabajo.
+
+    Las subclases encolan tuplas con `_put` (lanza queue.Full si no cabe) y
+    las procesan en `_execute(*item)`.
+    """
+
+    thread_name = 'worker'
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_threads(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"{self.thread_name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _put(self, item):
+        self._ensure_threads()
+        self._queue.put_nowait(item)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._execute(*item)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, *item):
+        raise NotImplementedError